@@ -1,20 +1,39 @@
+import functools
 import os
 from pathlib import Path
-import re
 from typing import Iterable, Sequence, Optional
 
 
-def _first_existing_path(env_names: Iterable[str], fallback: Path) -> Path:
-    for name in env_names:
-        value = os.getenv(name)
+@functools.cache
+def _env(name: str) -> Optional[str]:
+    """Read an environment variable once per process (tests can ``cache_clear()``)."""
+    return os.environ.get(name)
+
+
+def _first_env(*names: str) -> Optional[str]:
+    """Return the first non-empty value among ``names`` (legacy aliases last)."""
+    for name in names:
+        value = _env(name)
         if value:
-            return Path(value).expanduser()
+            return value
+    return None
+
+
+@functools.cache
+def _home() -> Path:
+    return Path.home()
+
+
+def _first_existing_path(env_names: Iterable[str], fallback: Path) -> Path:
+    value = _first_env(*env_names)
+    if value:
+        return Path(value).expanduser()
     return fallback
 
 
 def _env_flag(name: str, default: bool = False) -> bool:
     """Interpret boolean-ish environment variables."""
-    value = os.getenv(name)
+    value = _env(name)
     if value is None:
         return default
     return value.strip().lower() in {"1", "true", "yes", "on"}
@@ -22,17 +41,36 @@ def _env_flag(name: str, default: bool = False) -> bool:
 
 DEFAULT_HOME = _first_existing_path(
     ("PLOTTERSTUDIO_HOME", "SYNTHDRAW_HOME"),
-    Path.home() / "plotter-studio",
+    _home() / "plotter-studio",
 )
 
 DATA_DIR = _first_existing_path(
     ("PLOTTERSTUDIO_DATA_DIR", "SYNTHDRAW_DATA_DIR"),
     DEFAULT_HOME / "uploads",
 )
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+_data_dir_ready = False
+
+# Settings and session JSON files; writers create it when they first save.
+SETTINGS_DIR = DEFAULT_HOME / "settings"
+
+
+def ensure_data_dir() -> Path:
+    """Create DATA_DIR on first use instead of at import time."""
+    global _data_dir_ready
+    if not _data_dir_ready:
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        _data_dir_ready = True
+    return DATA_DIR
+
 
 OFFLINE_MODE = _env_flag("PLOTTERSTUDIO_OFFLINE")
 
+# Per-request method/path/timing logs; off unless debugging.
+DEBUG_REQUESTS = _env_flag("PLOTTERSTUDIO_DEBUG_REQUESTS")
+
+# Uploads larger than this are rejected before any XML parser sees them.
+MAX_SVG_BYTES = int(_env("PLOTTERSTUDIO_MAX_SVG_BYTES") or 50 * 1024 * 1024)
+
 
 DEFAULT_CORS_ORIGINS: tuple[str, ...] = (
     "http://localhost:2121",
@@ -44,27 +82,38 @@ DEFAULT_CORS_ORIGINS: tuple[str, ...] = (
     # Production dashboard port
     "http://192.168.1.37:3131",
 )
+_DEFAULT_CORS_SET: frozenset[str] = frozenset(DEFAULT_CORS_ORIGINS)
 
 
 def cors_origins(extra: Sequence[str] | None = None) -> list[str]:
     """Return default CORS origins merged with optional overrides."""
+    if not extra:
+        return list(DEFAULT_CORS_ORIGINS)
+    seen = set(_DEFAULT_CORS_SET)
     merged = list(DEFAULT_CORS_ORIGINS)
-    if extra:
-        merged.extend(value for value in extra if value not in merged)
+    for value in extra:
+        if value not in seen:
+            seen.add(value)
+            merged.append(value)
     return merged
 
 
+@functools.lru_cache(maxsize=1)
 def dashboard_origin_regex() -> Optional[str]:
     """Allow dashboard to access API from any host when using its configured port.
     
     Supports both development (2121, 5173) and production (3131) ports.
+    The environment is only read once; the result is cached for the process.
     """
-    port = os.getenv("DASHBOARD_PORT")
-    if not port:
-        # If no port specified, allow common dev and production ports
-        return r"^https?://[^/]+:(2121|5173|3131)$"
-    port = port.strip()
-    if not port:
+    raw = (_env("DASHBOARD_PORT") or "").strip()
+    try:
+        port = int(raw)
+    except ValueError:
+        port = 0
+    if not 0 < port < 65536:
+        # If no valid port specified, allow common dev and production ports
         return r"^https?://[^/]+:(2121|5173|3131)$"
-    escaped = re.escape(port)
-    return rf"^https?://[^/]+:{escaped}$"
+    return rf"^https?://[^/]+:{port}$"
+
+
+DASHBOARD_ORIGIN_REGEX = dashboard_origin_regex()
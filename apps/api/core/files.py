@@ -1,53 +1,348 @@
+import functools
+import hashlib
+import os
 import re
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import shutil
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Any, Optional
+from types import MappingProxyType
+from typing import Any, BinaryIO, Optional
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import unescape
 
 from fastapi import HTTPException
 
-from core.config import DATA_DIR
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+from core.config import DATA_DIR, MAX_SVG_BYTES, ensure_data_dir
+from core.utils import _LRUCache, _sanitize_filename
+
+_SVG_HEAD_BYTES = 4096
+_SVG_HEAD_LIMIT = 64 * 1024
+_UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+_XML_COMMENT_RE = re.compile(rb"<!--.*?-->", re.DOTALL)
+_ELEMENT_START_RE = re.compile(rb"<[A-Za-z_]")
+_ROOT_TAG_RE = re.compile(rb"<([A-Za-z_][\w.:-]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>")
+_XML_ATTR_RE = re.compile(rb"([A-Za-z_][\w.:-]*)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+_XML_ENTITIES = MappingProxyType({"&quot;": '"', "&apos;": "'"})
+_ENTITY_DECL_RE = re.compile(rb"<!ENTITY\b")
+
+# Full-document SVG parsing uses libxml2 when lxml is installed. Entities
+# stay unexpanded and nothing is fetched; _check_svg_safe runs first anyway.
+if etree is not None:
+    _LXML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+    SVG_PARSE_ERRORS: tuple[type[Exception], ...] = (ET.ParseError, etree.XMLSyntaxError)
+else:
+    SVG_PARSE_ERRORS = (ET.ParseError,)
+
+# Root-tag dimensions keyed by (path, st_mtime_ns, st_size), least recent first.
+_META_CACHE = _LRUCache(1024)
+
+# Names present in DATA_DIR as of one directory scan, rescanned whenever the
+# directory's mtime moves (files added or removed outside the API included).
+_EXISTING_NAMES: set[str] | None = None
+_EXISTING_MTIME_NS: int | None = None
+# Names handed out by _unique_filename whose upload isn't in place yet.
+_RESERVED_NAMES: set[str] = set()
+_EXISTING_LOCK = threading.Lock()
+# After this many numbered collisions fall back to a short hash suffix.
+_HASH_SUFFIX_AFTER = 8
 
 
 def _extract_svg_dimensions(path: Path) -> dict[str, Any]:
-    width: Optional[str] = None
-    height: Optional[str] = None
-    viewbox: Optional[str] = None
+    """Read width/height/viewBox from the root ``<svg>`` tag.
+
+    Only the opening root tag is scanned, so cost is bounded by
+    ``_SVG_HEAD_LIMIT`` regardless of document size and no entities are
+    ever expanded.
+    """
+    attrs: dict[str, str] = {}
 
     try:
-        tree = ET.parse(path)
-        root = tree.getroot()
-        if root.tag.lower().endswith("svg"):
-            width = root.attrib.get("width")
-            height = root.attrib.get("height")
-            viewbox = root.attrib.get("viewBox")
-    except Exception:
+        with path.open("rb") as handle:
+            head = b""
+            while len(head) < _SVG_HEAD_LIMIT:
+                chunk = handle.read(_SVG_HEAD_BYTES)
+                head += chunk
+                scan = _XML_COMMENT_RE.sub(b"", head)
+                start = _ELEMENT_START_RE.search(scan)
+                match = _ROOT_TAG_RE.match(scan, start.start()) if start else None
+                if match or not chunk:
+                    break
+        if match and match.group(1).lower().endswith(b"svg"):
+            for name, double, single in _XML_ATTR_RE.findall(match.group(2)):
+                value = double or single
+                attrs[name.decode("utf-8", "replace")] = unescape(
+                    value.decode("utf-8", "replace"), _XML_ENTITIES
+                )
+    except OSError:
         pass
 
-    return {"width": width, "height": height, "viewBox": viewbox}
+    return {
+        "width": attrs.get("width"),
+        "height": attrs.get("height"),
+        "viewBox": attrs.get("viewBox"),
+    }
+
+
+def _check_svg_safe(path: Path, stat: Optional[os.stat_result] = None) -> None:
+    """Reject SVGs that are oversized or declare XML entities before parsing.
+
+    Guards the full-document parsers (layers, rotation) against entity
+    expansion bombs and unbounded memory use. Pass ``stat`` when the caller
+    already has it to skip another ``stat`` call.
+    """
+    try:
+        size = (stat or path.stat()).st_size
+        with path.open("rb") as handle:
+            head = handle.read(_SVG_HEAD_LIMIT)
+    except OSError as exc:
+        raise HTTPException(status_code=404, detail="File not found") from exc
+    if size > MAX_SVG_BYTES:
+        raise HTTPException(status_code=413, detail="SVG file is too large")
+    if _ENTITY_DECL_RE.search(head):
+        raise HTTPException(status_code=400, detail="SVG entity declarations are not supported")
+
+
+def _cached_dimensions(path: Path, stat: os.stat_result) -> dict[str, Any]:
+    """``_extract_svg_dimensions`` memoized on the file's mtime and size."""
+    key = (os.fspath(path), stat.st_mtime_ns, stat.st_size)
+    dimensions = _META_CACHE.get(key)
+    if dimensions is None:
+        dimensions = _extract_svg_dimensions(path)
+        _META_CACHE.put(key, dimensions)
+    return dimensions
+
+
+def _disk_fileno(source: BinaryIO) -> Optional[int]:
+    """Return the fd behind ``source`` if it is a real file, else ``None``.
+
+    A spooled upload still held in memory is left alone: asking it for a
+    fileno would force it to roll over to disk.
+    """
+    if isinstance(source, tempfile.SpooledTemporaryFile) and not source._rolled:
+        return None
+    try:
+        return source.fileno()
+    except (AttributeError, OSError):
+        return None
+
+
+def _sendfile_upload(src_fd: int, dst_fd: int, size: int) -> int:
+    """Copy ``size`` bytes from offset 0 in-kernel; returns bytes copied."""
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+    return offset
+
+
+def _write_upload(source: BinaryIO, target: Path, size: Optional[int] = None) -> int:
+    """Copy an upload stream to ``target``; returns the number of bytes written.
+
+    Blocking, so async routes should run it in a worker thread. Raises 413
+    once more than ``MAX_SVG_BYTES`` have been read. A known ``size`` is
+    checked up front and pre-allocated so the file is laid out in one go,
+    and the copy then needs no per-chunk accounting. Uploads Starlette has
+    already spooled to disk are copied with ``sendfile`` rather than through
+    Python buffers.
+    """
+    if size is not None and size > MAX_SVG_BYTES:
+        raise HTTPException(status_code=413, detail="SVG file is too large")
+    bytes_written = 0
+    with target.open("wb") as handle:
+        if size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(handle.fileno(), 0, size)
+            except OSError:
+                pass  # not supported by this filesystem; write normally
+        if size is not None:
+            src_fd = _disk_fileno(source) if hasattr(os, "sendfile") else None
+            if src_fd is not None:
+                try:
+                    bytes_written = _sendfile_upload(src_fd, handle.fileno(), size)
+                except OSError:
+                    src_fd = None  # e.g. unsupported filesystem; copy below
+                    source.seek(0)
+                    handle.seek(0)
+            if src_fd is None:
+                shutil.copyfileobj(source, handle, _UPLOAD_CHUNK_BYTES)
+                bytes_written = handle.tell()
+            if bytes_written != size:
+                handle.truncate(bytes_written)
+            return bytes_written
+        while True:
+            chunk = source.read(_UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            bytes_written += len(chunk)
+            if bytes_written > MAX_SVG_BYTES:
+                raise HTTPException(status_code=413, detail="SVG file is too large")
+            handle.write(chunk)
+    return bytes_written
+
+
+def _parse_svg_tree(path: Path):
+    """Parse a whole SVG with lxml if available, else ElementTree."""
+    if etree is not None:
+        return etree.parse(os.fspath(path), _LXML_PARSER)
+    return ET.parse(path)
+
 
+def _iterparse_svg(path: Path, events: tuple[str, ...]):
+    """``iterparse`` over an SVG with lxml if available, else ElementTree."""
+    if etree is not None:
+        return etree.iterparse(
+            os.fspath(path), events=events, resolve_entities=False, no_network=True
+        )
+    return ET.iterparse(path, events=events)
 
-def _file_metadata(path: Path) -> dict[str, Any]:
-    stat = path.stat()
+
+@functools.lru_cache(maxsize=256)
+def _iso_seconds(seconds: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(seconds))
+
+
+def _iso_mtime(mtime: float) -> str:
+    """Format a timestamp like ``datetime.fromtimestamp(mtime).isoformat()``."""
+    seconds = int(mtime)
+    micros = round((mtime - seconds) * 1_000_000)
+    if micros >= 1_000_000:
+        seconds += 1
+        micros -= 1_000_000
+    text = _iso_seconds(seconds)
+    return f"{text}.{micros:06d}" if micros else text
+
+
+def _file_metadata(path: Path, stat: Optional[os.stat_result] = None) -> dict[str, Any]:
+    """Describe an uploaded SVG. Pass ``stat`` when the caller already has it."""
+    if stat is None:
+        stat = path.stat()
     metadata = {
         "name": path.name,
         "size": stat.st_size,
-        "updated_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        "updated_at": _iso_mtime(stat.st_mtime),
     }
-    metadata.update(_extract_svg_dimensions(path))
+    metadata.update(_cached_dimensions(path, stat))
     return metadata
 
 
+@functools.lru_cache(maxsize=512)
+def _resolve_upload(name: str) -> tuple[str, Path]:
+    """Map a requested filename to ``(safe_name, path in DATA_DIR)``.
+
+    Pure in ``name`` (DATA_DIR is fixed per process), so renames and deletes
+    need no invalidation; invalid names raise and are not cached.
+    """
+    safe_name = _sanitize_filename(name)
+    return safe_name, DATA_DIR / safe_name
+
+
+def _existing_names() -> set[str]:
+    """Return the filenames in DATA_DIR. Caller holds the lock.
+
+    Costs one ``stat`` of the directory while it is unchanged.
+    """
+    global _EXISTING_NAMES, _EXISTING_MTIME_NS
+    mtime_ns = os.stat(ensure_data_dir()).st_mtime_ns
+    if _EXISTING_NAMES is None or mtime_ns != _EXISTING_MTIME_NS:
+        with os.scandir(DATA_DIR) as entries:
+            _EXISTING_NAMES = {entry.name for entry in entries}
+        _EXISTING_MTIME_NS = mtime_ns
+    return _EXISTING_NAMES
+
+
+def _remember_filename(name: str) -> None:
+    with _EXISTING_LOCK:
+        if _EXISTING_NAMES is not None:
+            _EXISTING_NAMES.add(name)
+
+
+def _release_filename(name: str) -> None:
+    """Drop the reservation for an upload that has been moved into place."""
+    with _EXISTING_LOCK:
+        _RESERVED_NAMES.discard(name)
+
+
+def _forget_filename(name: str) -> None:
+    """Drop ``name`` after a delete or an abandoned upload."""
+    with _EXISTING_LOCK:
+        _RESERVED_NAMES.discard(name)
+        if _EXISTING_NAMES is not None:
+            _EXISTING_NAMES.discard(name)
+
+
+def _file_metadata_from_entry(entry: os.DirEntry) -> dict[str, Any]:
+    return _file_metadata(Path(entry.path), entry.stat())
+
+
+def _file_metadata_batch(entries: list[os.DirEntry]) -> dict[str, list[Any]]:
+    """Column-oriented metadata for many files (one list per field)."""
+    columns: dict[str, list[Any]] = {
+        "name": [],
+        "size": [],
+        "updated_at": [],
+        "width": [],
+        "height": [],
+        "viewBox": [],
+    }
+    for entry in entries:
+        stat = entry.stat()
+        dimensions = _cached_dimensions(Path(entry.path), stat)
+        columns["name"].append(entry.name)
+        columns["size"].append(stat.st_size)
+        columns["updated_at"].append(_iso_mtime(stat.st_mtime))
+        columns["width"].append(dimensions["width"])
+        columns["height"].append(dimensions["height"])
+        columns["viewBox"].append(dimensions["viewBox"])
+    return columns
+
+
+def _list_svg_entries() -> list[os.DirEntry]:
+    """Return SVG files in DATA_DIR from a single scandir sweep, sorted by name."""
+    with os.scandir(ensure_data_dir()) as entries:
+        files = [
+            entry for entry in entries
+            if entry.name.lower().endswith(".svg") and entry.is_file()
+        ]
+    files.sort(key=lambda entry: entry.name.lower())
+    return files
+
+
 def _unique_filename(base: str) -> str:
-    candidate = DATA_DIR / base
-    if not candidate.exists():
-        return base
-
-    stem = Path(base).stem
-    suffix = Path(base).suffix
-    counter = 1
-    while True:
-        candidate_name = f"{stem}_{counter}{suffix}"
-        if not (DATA_DIR / candidate_name).exists():
+    """Pick a free name in DATA_DIR for ``base`` and reserve it.
+
+    Call ``_release_filename`` once the upload is in place, or
+    ``_forget_filename`` if the reserved name ends up unused.
+    """
+    stem, suffix = os.path.splitext(base)
+    template = f"{stem}_{{}}{suffix}"
+    data_dir = os.fspath(DATA_DIR)
+
+    def candidates():
+        yield base
+        for counter in range(1, _HASH_SUFFIX_AFTER + 1):
+            yield template.format(counter)
+        while True:
+            seed = f"{base}:{time.time_ns()}".encode()
+            yield template.format(hashlib.blake2b(seed, digest_size=4).hexdigest())
+
+    with _EXISTING_LOCK:
+        names = _existing_names()
+        for candidate_name in candidates():
+            if candidate_name in names or candidate_name in _RESERVED_NAMES:
+                continue
+            # Only the pick is confirmed on disk, for changes that landed
+            # within the same mtime tick as the last scan.
+            if os.path.lexists(os.path.join(data_dir, candidate_name)):
+                names.add(candidate_name)
+                continue
+            _RESERVED_NAMES.add(candidate_name)
             return candidate_name
-        counter += 1
@@ -1,3 +1,6 @@
+import asyncio
+import functools
+import io
 import os
 import re
 import shlex
@@ -8,96 +11,308 @@ import threading
 import time
 import logging
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Optional, Sequence
+from types import MappingProxyType
+from typing import Any, Iterator, Optional, Sequence
 from fastapi import HTTPException
 
 try:
-    from svgpathtools import svg2paths2
+    import numpy as np
+    from svgpathtools import CubicBezier, Line, QuadraticBezier, svg2paths2
 except ImportError:
     svg2paths2 = None
 
-from core.config import OFFLINE_MODE
+try:
+    from nextdraw import NextDraw
+except ImportError:
+    NextDraw = None
+
+try:
+    import vpype
+except ImportError:
+    vpype = None
+
+from core.config import OFFLINE_MODE, _first_env
 from core.state import JOB
-from core.utils import _sanitize_filename
+from core.utils import _LRUCache, _compile_linear, _sanitize_filename
 
 logger = logging.getLogger("plotterstudio.api")
 
-# Regex patterns for parsing nextdraw output
-PROGRESS_RE = re.compile(r"(?:Progress|Percent complete):\s*([0-9.]+)\s*%", re.IGNORECASE)
-TIME_RE = re.compile(r"(?:Elapsed|Time):\s*(\d+):(\d+)(?::(\d+))?", re.IGNORECASE)
-DIST_RE = re.compile(r"(?:Distance|draw):\s*([0-9.]+)\s*([a-zA-Z]*)", re.IGNORECASE)
+# Regex pattern for parsing nextdraw plot output (bytes: lines are never decoded
+# unless logged or reported as an error)
+METRIC_RE = re.compile(
+    rb"(?:Progress|Percent complete):\s*(?P<pct>[0-9.]+)\s*%"
+    rb"|(?:Elapsed|Time):\s*(?P<t1>\d+):(?P<t2>\d+)(?::(?P<t3>\d+))?"
+    rb"|(?:Distance|draw):\s*(?P<dist>[0-9.]+)\s*(?P<unit>[a-zA-Z]*)",
+    re.IGNORECASE,
+)
+# Regex patterns for parsing nextdraw --preview output and SVG attributes
+PREVIEW_TIME_RE = re.compile(r"Estimated print time:\s*([0-9:]+)")
+PREVIEW_DIST_RE = re.compile(r"draw:\s*([0-9.]+)\s*mm", re.IGNORECASE)
+LENGTH_RE = _compile_linear(r"^([+-]?(?:\d+\.\d+|\d+|\.\d+)(?:[eE][+-]?\d+)?)\s*([a-zA-Z%]*)$")
+VIEWBOX_SPLIT_RE = re.compile(r"[\s,]+")
+
+# Unit -> millimetre factors for SVG length attributes
+_LENGTH_FACTORS = MappingProxyType({
+    "": 1.0,
+    "mm": 1.0,
+    "millimeter": 1.0,
+    "millimeters": 1.0,
+    "cm": 10.0,
+    "centimeter": 10.0,
+    "centimeters": 10.0,
+    "m": 1000.0,
+    "meter": 1000.0,
+    "meters": 1000.0,
+    "in": 25.4,
+    "inch": 25.4,
+    "inches": 25.4,
+    "pt": 25.4 / 72.0,
+    "pc": 25.4 / 6.0,
+    "px": 25.4 / 96.0,
+    "q": 0.25,
+})
+
+# Unit -> millimetre factors for distances in nextdraw progress output
+_DISTANCE_UNITS_MM = MappingProxyType({
+    b"": 1.0,
+    b"mm": 1.0,
+    b"millimeter": 1.0,
+    b"millimeters": 1.0,
+    b"cm": 10.0,
+    b"centimeter": 10.0,
+    b"centimeters": 10.0,
+    b"m": 1000.0,
+    b"meter": 1000.0,
+    b"meters": 1000.0,
+    b"in": 25.4,
+    b"inch": 25.4,
+    b"inches": 25.4,
+})
+
+# Read size for the plot progress pipe.
+_PIPE_READ_BYTES = 65536
+
+# Runs SVG distance estimates alongside nextdraw preview subprocesses.
+_ESTIMATE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="distance-estimate")
+
+# Distances by file identity, so the hard-linked plot working copy reuses
+# what a preview of the uploaded file already measured.
+_DIST_CACHE = _LRUCache(64)
+
+# nextdraw preview results by file identity plus the options that affect
+# them, so slider tweaks that land back on a seen setting skip the run.
+_PREVIEW_CACHE = _LRUCache(256)
+
+# 5-point Gauss-Legendre nodes/weights mapped onto t in [0, 1].
+_GAUSS_LEGENDRE_5 = tuple(
+    ((x + 1.0) / 2.0, w / 2.0)
+    for x, w in (
+        (0.0, 0.5688888888888889),
+        (-0.5384693101056831, 0.4786286704993665),
+        (0.5384693101056831, 0.4786286704993665),
+        (-0.9061798459386640, 0.2369268850561891),
+        (0.9061798459386640, 0.2369268850561891),
+    )
+)
+# Tolerance for segments without a closed-form/quadrature path (arcs).
+_LENGTH_ERROR = 1e-2
 
 
 def _format_command(args):
     """Return a clean string version of the nextdraw command."""
     if isinstance(args, (list, tuple)):
-        return " ".join(str(a) for a in args)
+        return " ".join(map(str, args))
     return str(args)
 
 
 def _offline_completed_process(
     args: Sequence[str],
     context: str,
+    command_text: Optional[str] = None,
 ) -> subprocess.CompletedProcess[str]:
-    note = f"[offline:{context}] {_format_command(args)}"
+    if command_text is None:
+        command_text = _format_command(args)
+    note = f"[offline:{context}] {command_text}"
     return subprocess.CompletedProcess(args=args, returncode=0, stdout=note, stderr="")
 
 
-def _nextdraw_base() -> list[str]:
-    value = (
-        os.getenv("PLOTTERSTUDIO_NEXTDRAW")
-        or os.getenv("SYNTHDRAW_AXICLI")
-        or os.getenv("NEXTDRAW_CLI")
-    )
+# Env vars that point at a specific nextdraw binary
+_NEXTDRAW_OVERRIDE_ENV = ("PLOTTERSTUDIO_NEXTDRAW", "SYNTHDRAW_AXICLI", "NEXTDRAW_CLI")
+
+
+@functools.lru_cache(maxsize=1)
+def _nextdraw_base() -> tuple[str, ...]:
+    """Resolve the nextdraw command once per process (``cache_clear()`` to re-read)."""
+    value = _first_env(*_NEXTDRAW_OVERRIDE_ENV)
     if value:
-        return shlex.split(os.path.expanduser(value))
-    home = (
-        os.getenv("PLOTTERSTUDIO_HOME")
-        or os.getenv("PLOTTERSTUDIO_API_HOME")
-        or os.getenv("SYNTHDRAW_HOME")
-        or os.getenv("SYNTHDRAW_API_HOME")
+        return tuple(shlex.split(os.path.expanduser(value)))
+    home = _first_env(
+        "PLOTTERSTUDIO_HOME",
+        "PLOTTERSTUDIO_API_HOME",
+        "SYNTHDRAW_HOME",
+        "SYNTHDRAW_API_HOME",
     )
     if home:
         candidate = Path(home).expanduser() / "venv" / "bin" / "nextdraw"
         if candidate.exists():
-            return [str(candidate)]
-    return ["nextdraw"]
+            return (str(candidate),)
+    return ("nextdraw",)
+
+
+class NextdrawSession:
+    """A long-lived in-process NextDraw API object for utility commands.
 
+    Utility commands (walk, pen toggle, motors on/off) are short, so spawning
+    the nextdraw CLI for each one is dominated by interpreter and library
+    start-up. This keeps one ``NextDraw`` instance around and maps the subset
+    of CLI flags the dashboard sends onto its options. Anything it does not
+    understand is left to the subprocess path.
+
+    Messages are collected through the API's ``user_message_fun`` hook rather
+    than by redirecting ``sys.stdout``, which would also capture whatever
+    other threads print while the command runs.
+    """
+
+    # CLI flag -> (option name, converter)
+    FLAGS: dict[str, tuple[str, Any]] = {
+        "-L": ("model", int),
+        "--model": ("model", int),
+        "-m": ("mode", str),
+        "--mode": ("mode", str),
+        "-M": ("utility_cmd", str),
+        "--utility_cmd": ("utility_cmd", str),
+        "--dist": ("dist", float),
+        "--port": ("port", str),
+        "--penlift": ("penlift", int),
+        "--pen_pos_up": ("pen_pos_up", int),
+        "--pen_pos_down": ("pen_pos_down", int),
+    }
 
-def _run_command(command: str) -> subprocess.CompletedProcess[str]:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._nd = None
+
+    @classmethod
+    def parse(cls, argv: Sequence[str]) -> Optional[dict[str, Any]]:
+        """Map CLI arguments to API options, or ``None`` if unsupported."""
+        options: dict[str, Any] = {}
+        index = 0
+        while index < len(argv):
+            token = argv[index]
+            flag, _, value = token.partition("=")
+            if flag not in cls.FLAGS and flag[:2] in cls.FLAGS and flag[:2] != "--":
+                # Joined short form such as -L8
+                flag, value = flag[:2], flag[2:]
+            spec = cls.FLAGS.get(flag)
+            if spec is None:
+                return None
+            if not value:
+                index += 1
+                if index >= len(argv):
+                    return None
+                value = argv[index]
+            name, convert = spec
+            try:
+                options[name] = convert(value)
+            except ValueError:
+                return None
+            index += 1
+        if options.get("mode") != "utility" or "utility_cmd" not in options:
+            return None
+        return options
+
+    def run(self, args: Sequence[str], options: dict[str, Any]) -> subprocess.CompletedProcess[str]:
+        out = io.StringIO()
+        err = io.StringIO()
+
+        def collect(message: Any = "", *_args: Any, **_kwargs: Any) -> None:
+            out.write(f"{message}\n")
+
+        with self._lock:
+            if self._nd is None:
+                self._nd = NextDraw()
+            nd = self._nd
+            try:
+                nd.plot_setup()
+                nd.user_message_fun = collect
+                for name, value in options.items():
+                    setattr(nd.options, name, value)
+                nd.plot_run()
+                errors = getattr(nd, "errors", None)
+                returncode = int(getattr(errors, "code", 0) or 0)
+            except Exception as exc:
+                logger.exception("NextDraw API call failed: %s", exc)
+                # Drop the instance so the next call starts from a clean state.
+                self._nd = None
+                err.write(str(exc))
+                returncode = 1
+        return subprocess.CompletedProcess(
+            args=list(args),
+            returncode=returncode,
+            stdout=out.getvalue(),
+            stderr=err.getvalue(),
+        )
+
+
+# An explicitly configured binary (a specific venv or version) is always
+# honoured, so the in-process session only stands in for the default one.
+_SESSION = (
+    NextdrawSession()
+    if NextDraw is not None and not _first_env(*_NEXTDRAW_OVERRIDE_ENV)
+    else None
+)
+
+
+async def _run_command(command: str) -> subprocess.CompletedProcess[str]:
     """Execute a raw nextdraw command string. The command should already include all flags.
     
     The command string from the dashboard will start with 'nextdraw', but we replace it
     with the configured base command (which may be a custom path).
+
+    Awaited from the event loop: the CLI runs as an asyncio subprocess and the
+    in-process API call in a worker thread, so a slow pen or motor command
+    doesn't hold a threadpool worker.
     """
-    logger.info("Received command string: %s", command)
-    
     # Parse the command string into arguments
     parts = shlex.split(command)
-    logger.info("Parsed command parts: %s", parts)
     
     # Replace 'nextdraw' with the configured base command
     if parts and parts[0] == 'nextdraw':
-        base_cmd = _nextdraw_base()
-        logger.info("Base command resolved to: %s", base_cmd)
-        args = [*base_cmd, *parts[1:]]
+        args = [*_nextdraw_base(), *parts[1:]]
     else:
         # If it doesn't start with 'nextdraw', use as-is (might be a full path)
         args = parts
     
-    logger.info("Final command to execute: %s", _format_command(args))
-    logger.info("Command args list: %s", args)
+    cmd_str = _format_command(args)
+    # One record per command: the resolved command line plus what was received.
+    logger.info("nextdraw command: %s (received %r)", cmd_str, command)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Command args list: %r", args)
     
     if OFFLINE_MODE:
         logger.info("Offline mode: skipping command execution.")
-        return _offline_completed_process(args, "command")
+        return _offline_completed_process(args, "command", cmd_str)
+    if _SESSION is not None and parts and parts[0] == "nextdraw":
+        options = _SESSION.parse(parts[1:])
+        if options is not None:
+            logger.info("Running utility command in-process: %s", options)
+            result = await asyncio.to_thread(_SESSION.run, args, options)
+            logger.info("Command executed. Return code: %d", result.returncode)
+            return result
     try:
-        result = subprocess.run(
-            args,
-            check=False,
-            capture_output=True,
-            text=True,
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate()
+        result = subprocess.CompletedProcess(
+            args=args,
+            returncode=proc.returncode,
+            stdout=stdout.decode(errors="replace"),
+            stderr=stderr.decode(errors="replace"),
         )
         logger.info("Command executed. Return code: %d", result.returncode)
         if result.stdout:
@@ -150,67 +365,102 @@ def _manual_response(
     return payload
 
 
-def _watch_plot_progress(proc: subprocess.Popen[str]) -> None:
+def _iter_pipe_lines(fd: int) -> Iterator[bytes]:
+    """Yield raw lines from a binary pipe, reading up to 64 KiB per syscall.
+
+    Carriage returns count as line breaks, matching text-mode universal
+    newlines for progress bars that redraw in place.
+    """
+    pending = bytearray()
+    while True:
+        data = os.read(fd, _PIPE_READ_BYTES)
+        if not data:
+            break
+        pending += data.replace(b"\r", b"\n")
+        end = pending.rfind(b"\n")
+        if end == -1:
+            continue
+        yield from bytes(pending[:end]).split(b"\n")
+        del pending[: end + 1]
+    if pending:
+        yield bytes(pending)
+
+
+def _watch_plot_progress(proc: subprocess.Popen[bytes]) -> None:
     if proc.stdout is None:
         return
 
-    log_lines: deque[str] = deque(maxlen=200)
+    # Raw bytes; only decoded if the job fails and they become the error.
+    log_lines: deque[bytes] = deque(maxlen=200)
+    # Checked once per job so each line costs as little interpreter time
+    # (and GIL hold) as possible; the thread otherwise sits in read().
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
     try:
-        for raw_line in proc.stdout:
+        for raw_line in _iter_pipe_lines(proc.stdout.fileno()):
             line = raw_line.strip()
             if not line:
                 continue
             log_lines.append(line)
-            logger.debug("nextdraw: %s", line)
-            match = PROGRESS_RE.search(line)
-            if match:
-                try:
-                    value = float(match.group(1))
-                except ValueError:
-                    continue
-                JOB["progress"] = max(0.0, min(value, 100.0))
-            time_match = TIME_RE.search(line)
-            if time_match:
-                try:
-                    minutes = int(time_match.group(1))
-                    seconds = int(time_match.group(2))
+            if debug_enabled:
+                logger.debug("nextdraw: %s", line.decode("utf-8", "replace"))
+            # Every metric pattern needs a "label:" pair; skip the regex
+            # engine for the common non-matching lines.
+            if b":" not in line:
+                continue
+            for match in METRIC_RE.finditer(line):
+                if match.group("pct") is not None:
+                    try:
+                        value = float(match.group("pct"))
+                    except ValueError:
+                        continue
+                    JOB.progress = max(0.0, min(value, 100.0))
+                elif match.group("t1") is not None:
+                    minutes = int(match.group("t1"))
+                    seconds = int(match.group("t2"))
                     hours = 0
-                    if time_match.group(3):
+                    if match.group("t3"):
                         hours = minutes
                         minutes = seconds
-                        seconds = int(time_match.group(3))
-                    JOB["elapsed_override"] = hours * 3600 + minutes * 60 + seconds
-                except ValueError:
-                    pass
-            dist_match = DIST_RE.search(line)
-            if dist_match:
-                try:
-                    value = float(dist_match.group(1))
-                except ValueError:
-                    value = None
-                unit = (dist_match.group(2) or "").strip().lower()
-                if value is not None:
-                    if unit in {"", "mm", "millimeter", "millimeters"}:
-                        JOB["distance_mm"] = value
-                    elif unit in {"cm", "centimeter", "centimeters"}:
-                        JOB["distance_mm"] = value * 10.0
-                    elif unit in {"m", "meter", "meters"}:
-                        JOB["distance_mm"] = value * 1000.0
-                    elif unit in {"in", "inch", "inches"}:
-                        JOB["distance_mm"] = value * 25.4
+                        seconds = int(match.group("t3"))
+                    JOB.elapsed_override = hours * 3600 + minutes * 60 + seconds
+                else:
+                    try:
+                        value = float(match.group("dist"))
+                    except ValueError:
+                        continue
+                    factor = _DISTANCE_UNITS_MM.get(match.group("unit").lower())
+                    if factor is not None:
+                        JOB.distance_mm = value * factor
         proc.wait()
     finally:
-        if JOB.get("proc") is proc:
-            JOB["proc"] = None
-            JOB["end_time"] = time.time()
-            if proc.returncode == 0:
-                JOB["progress"] = 100.0
-                JOB["error"] = None
-            else:
-                JOB["progress"] = None
-                output_text = "\n".join(log_lines).strip()
-                JOB["error"] = output_text or f"nextdraw exited with code {proc.returncode}"
+        with JOB.lock:
+            if JOB.proc is proc:
+                JOB.proc = None
+                JOB.end_time = time.monotonic()
+                if proc.returncode == 0:
+                    JOB.progress = 100.0
+                    JOB.error = None
+                else:
+                    JOB.progress = None
+                    # Lines are stripped and non-empty on append, so no trailing strip needed.
+                    output_text = b"\n".join(log_lines).decode("utf-8", "replace")
+                    JOB.error = output_text or f"nextdraw exited with code {proc.returncode}"
+
+
+def _parse_clock_seconds(text: str) -> Optional[float]:
+    """Convert ``H:MM:SS``, ``M:SS`` or ``S`` to seconds."""
+    try:
+        pieces = [int(part) for part in text.split(":")]
+    except ValueError:
+        return None
+    if len(pieces) == 3:
+        return pieces[0] * 3600 + pieces[1] * 60 + pieces[2]
+    if len(pieces) == 2:
+        return pieces[0] * 60 + pieces[1]
+    if len(pieces) == 1:
+        return pieces[0]
+    return None
 
 
 def _preview_via_nextdraw(
@@ -219,71 +469,201 @@ def _preview_via_nextdraw(
     speed: int,
     penlift: Optional[int] = None,
 ) -> tuple[Optional[float], Optional[float]]:
+    """Return ``(seconds, distance_mm)`` from a nextdraw preview run.
+
+    The distance falls back to ``_estimate_distance_mm`` when nextdraw is
+    unavailable or does not report one.
+    """
     if OFFLINE_MODE:
         logger.info("Offline mode: skipping preview run for %s", svg_path)
         return None, _estimate_distance_mm(svg_path)
 
+    effective_handling = None if handling == 5 else handling
+    penlift = penlift if penlift in {1, 2, 3} else None
+    cache_key = _distance_cache_key(svg_path)
+    if cache_key is not None:
+        # Speed is only passed through for handling 4.
+        cache_key += (effective_handling, speed if effective_handling == 4 else None, penlift)
+        cached = _PREVIEW_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
     args: list[str] = [*_nextdraw_base()]
     args.extend([str(svg_path), "--preview", "--report_time"])
 
-    effective_handling = None if handling == 5 else handling
     if effective_handling is not None:
         args.extend(["--handling", str(effective_handling)])
         if effective_handling == 4:
             args.extend(["-s", str(speed)])
 
-    if penlift in {1, 2, 3}:
+    if penlift is not None:
         args.extend(["--penlift", str(penlift)])
 
-    logger.debug("Running nextdraw preview: %s", _format_command(args))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Running nextdraw preview: %s", _format_command(args))
+    # Compute the intrinsic SVG distance while nextdraw runs; it is the
+    # fallback whenever the preview output does not report a distance.
+    fallback_distance = _ESTIMATE_POOL.submit(_estimate_distance_mm, svg_path)
     try:
-        proc = subprocess.run(args, capture_output=True, text=True, timeout=60)
+        proc = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
     except FileNotFoundError:
-        return None, None
-    except subprocess.TimeoutExpired:
-        logger.warning("nextdraw preview timed out for %s", svg_path)
-        return None, None
+        return None, fallback_distance.result()
 
-    output = "\n".join(filter(None, [proc.stdout, proc.stderr]))
-    output_text = output.strip()
-    time_match = re.search(r"Estimated print time:\s*([0-9:]+)", output)
-    distance_match = re.search(r"draw:\s*([0-9.]+)\s*mm", output, re.IGNORECASE)
+    timed_out = threading.Event()
 
-    est_seconds: Optional[float] = None
-    if time_match:
-        parts = time_match.group(1).split(":")
-        try:
-            pieces = [int(part) for part in parts]
-            if len(pieces) == 3:
-                est_seconds = pieces[0] * 3600 + pieces[1] * 60 + pieces[2]
-            elif len(pieces) == 2:
-                est_seconds = pieces[0] * 60 + pieces[1]
-            elif len(pieces) == 1:
-                est_seconds = pieces[0]
-        except ValueError:
-            est_seconds = None
+    def _expire() -> None:
+        timed_out.set()
+        proc.kill()
 
+    # Scan the output as it streams and stop once both figures are known;
+    # only the tail is kept, for the failure log.
+    est_seconds: Optional[float] = None
     est_distance: Optional[float] = None
-    if distance_match:
-        try:
-            est_distance = float(distance_match.group(1))
-        except ValueError:
-            est_distance = None
+    tail: deque[str] = deque(maxlen=50)
+    timer = threading.Timer(60, _expire)
+    timer.start()
+    try:
+        for line in proc.stdout:
+            tail.append(line)
+            if est_seconds is None:
+                time_match = PREVIEW_TIME_RE.search(line)
+                if time_match:
+                    est_seconds = _parse_clock_seconds(time_match.group(1))
+            if est_distance is None:
+                distance_match = PREVIEW_DIST_RE.search(line)
+                if distance_match:
+                    try:
+                        est_distance = float(distance_match.group(1))
+                    except ValueError:
+                        est_distance = None
+            if est_seconds is not None and est_distance is not None:
+                # A preview has no side effects, so nothing is lost by
+                # not letting it finish.
+                proc.kill()
+                break
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+        returncode = proc.wait()
 
-    if proc.returncode != 0 and est_seconds is None and est_distance is None:
+    if timed_out.is_set():
+        logger.warning("nextdraw preview timed out for %s", svg_path)
+        return None, fallback_distance.result()
+
+    failed = returncode != 0 and est_seconds is None and est_distance is None
+    if failed:
+        output_text = "".join(tail).strip()
         if output_text:
             logger.warning(
                 "nextdraw preview failed with code %s: %s",
-                proc.returncode,
+                returncode,
                 output_text,
             )
         else:
-            logger.warning("nextdraw preview failed with code %s", proc.returncode)
+            logger.warning("nextdraw preview failed with code %s", returncode)
+
+    if est_distance is None:
+        est_distance = fallback_distance.result()
+    else:
+        _remember_distance(svg_path, est_distance, replace=True)
+
+    # Failures are not cached so the next request retries nextdraw.
+    if cache_key is not None and not failed:
+        _PREVIEW_CACHE.put(cache_key, (est_seconds, est_distance))
 
     return est_seconds, est_distance
 
 
-def _estimate_distance_mm(path: Path) -> float | None:
+def _total_segment_length(paths: Sequence[Any]) -> float:
+    """Approximate the summed length of every segment; plenty accurate for an estimate.
+
+    svgpathtools integrates Bezier lengths adaptively to 1e-12, which
+    dominates preview time on dense drawings. Segments are grouped by type
+    and measured in bulk with NumPy: lines are exact, Beziers use fixed
+    5-point Gauss-Legendre quadrature of |B'(t)|, and anything else (arcs)
+    falls back to svgpathtools with a relaxed tolerance.
+    """
+    lines: list[tuple[complex, complex]] = []
+    cubics: list[tuple[complex, complex, complex, complex]] = []
+    quads: list[tuple[complex, complex, complex]] = []
+    total = 0.0
+    for geom in paths:
+        for segment in geom:
+            if isinstance(segment, Line):
+                lines.append((segment.start, segment.end))
+            elif isinstance(segment, CubicBezier):
+                cubics.append((segment.start, segment.control1, segment.control2, segment.end))
+            elif isinstance(segment, QuadraticBezier):
+                quads.append((segment.start, segment.control, segment.end))
+            else:
+                try:
+                    total += float(segment.length(error=_LENGTH_ERROR))
+                except Exception:
+                    continue
+
+    t = np.array([node for node, _ in _GAUSS_LEGENDRE_5])
+    weights = np.array([weight for _, weight in _GAUSS_LEGENDRE_5])
+    mt = 1.0 - t
+    if lines:
+        pts = np.array(lines, dtype=complex)
+        total += float(np.abs(pts[:, 1] - pts[:, 0]).sum())
+    if cubics:
+        pts = np.array(cubics, dtype=complex)
+        d0, d1, d2 = (np.diff(pts, axis=1) * 3.0).T
+        speed = np.abs(
+            np.outer(d0, mt * mt) + np.outer(d1, 2.0 * mt * t) + np.outer(d2, t * t)
+        )
+        total += float((speed @ weights).sum())
+    if quads:
+        pts = np.array(quads, dtype=complex)
+        d0, d1 = (np.diff(pts, axis=1) * 2.0).T
+        speed = np.abs(np.outer(d0, mt) + np.outer(d1, t))
+        total += float((speed @ weights).sum())
+    return total
+
+
+def _distance_cache_key(path: Path) -> Optional[tuple[int, int, int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _remember_distance(path: Path, distance: float, replace: bool = False) -> None:
+    """Cache ``distance`` for ``path``; nextdraw-reported values pass ``replace``."""
+    key = _distance_cache_key(path)
+    if key is None:
+        return
+    _DIST_CACHE.put(key, distance, replace=replace)
+
+
+def _estimate_distance_mm(path: Path, original: Optional[Path] = None) -> float | None:
+    """Pen-down distance of ``path``, from the cache when possible.
+
+    ``original`` is the file ``path`` was derived from (the upload behind
+    vpype's centred copy). Centring doesn't change path length, so a distance
+    cached for it is used before measuring ``path``.
+    """
+    for candidate in (original, path):
+        key = _distance_cache_key(candidate) if candidate is not None else None
+        if key is None:
+            continue
+        cached = _DIST_CACHE.get(key)
+        if cached is not None:
+            return cached
+    distance = _measure_distance_mm(path)
+    if distance is not None:
+        _remember_distance(path, distance)
+    return distance
+
+
+def _measure_distance_mm(path: Path) -> float | None:
     if svg2paths2 is None:
         return None
 
@@ -293,12 +673,7 @@ def _estimate_distance_mm(path: Path) -> float | None:
         logger.debug("Failed to parse SVG for distance %s", path, exc_info=True)
         return None
 
-    total_length = 0.0
-    for geom in paths:
-        try:
-            total_length += float(geom.length())
-        except Exception:
-            continue
+    total_length = _total_segment_length(paths)
 
     if total_length == 0.0:
         return 0.0
@@ -309,7 +684,7 @@ def _estimate_distance_mm(path: Path) -> float | None:
     height_attr = svg_attr.get("height") if svg_attr else None
 
     if viewbox_raw:
-        parts = re.split(r"[\s,]+", viewbox_raw.strip())
+        parts = VIEWBOX_SPLIT_RE.split(viewbox_raw.strip())
         if len(parts) == 4:
             try:
                 vb_width = float(parts[2])
@@ -330,6 +705,90 @@ def _estimate_distance_mm(path: Path) -> float | None:
     return total_length * scale
 
 
+# Segment length vpype's ``read`` uses by default when linearizing curves
+_VPYPE_QUANTIZATION = "0.1mm"
+
+
+def _center_with_vpype(source: Path, target: Path, page_flag: str) -> bool:
+    """Center ``source`` on the page with vpype, writing ``target``.
+
+    Uses vpype's document API in-process when it is importable (no
+    interpreter or plugin start-up per plot) and the ``vpype`` CLI otherwise.
+    The in-process path does what ``vpype read SRC write --page-size PAGE
+    --center DST`` does without going through vpype_cli, whose entry point
+    reconfigures the root logger. Returns ``True`` when ``target`` was written.
+    """
+    if vpype is not None:
+        try:
+            document = vpype.read_multilayer_svg(
+                str(source), quantization=vpype.convert_length(_VPYPE_QUANTIZATION)
+            )
+            if document.is_empty():
+                logger.warning("vpype found no geometry in %s; using original SVG", source)
+                return False
+            with target.open("w", encoding="utf-8") as output:
+                vpype.write_svg(
+                    output,
+                    document,
+                    page_size=vpype.convert_page_size(page_flag),
+                    center=True,
+                )
+            return True
+        except Exception as exc:
+            logger.warning("vpype failed (%s); falling back to original SVG", exc)
+            target.unlink(missing_ok=True)
+            return False
+
+    try:
+        vp = subprocess.run(
+            [
+                "vpype",
+                "read",
+                str(source),
+                "write",
+                "--page-size",
+                page_flag,
+                "--center",
+                str(target),
+            ],
+            capture_output=True,
+            text=True,
+        )
+    except FileNotFoundError:
+        logger.warning("vpype command not found; skipping centering step")
+        return False
+    if vp.returncode != 0:
+        logger.warning("vpype exited with %s; falling back to original SVG", vp.returncode)
+        if vp.stderr:
+            logger.debug("vpype stderr: %s", vp.stderr.strip())
+        return False
+    return True
+
+
+def _copy_working_file(source: Path, target: Path) -> None:
+    """Copy ``source`` to ``target`` in-kernel where possible, keeping its stat.
+
+    ``copy_file_range`` can share extents (reflink) on copy-on-write
+    filesystems; elsewhere shutil.copy2 (sendfile on Linux) does the copy.
+    """
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining <= 0:
+                shutil.copystat(source, target)
+                return
+        except OSError:
+            pass
+    shutil.copy2(source, target)
+
+
 def _start_plot_from_path(
     svg_source: Path,
     page: str,
@@ -344,49 +803,36 @@ def _start_plot_from_path(
     layer: Optional[str] = None,
     original_name: Optional[str] = None,
 ) -> dict[str, Any]:
-    if JOB["proc"] and JOB["proc"].poll() is None:
+    if JOB.proc and JOB.proc.poll() is None:
         raise HTTPException(status_code=409, detail="A job is already running")
 
     if not svg_source.exists():
         raise HTTPException(status_code=404, detail="SVG not found")
 
-    JOB["error"] = None
+    JOB.error = None
 
     temp_dir = Path(tempfile.mkdtemp(prefix="plotterstudio_plot_"))
     target_name = _sanitize_filename(original_name or svg_source.name)
     working_src = temp_dir / target_name
-    shutil.copy2(svg_source, working_src)
+    try:
+        # Uploads are only ever replaced (os.replace), never rewritten in
+        # place, so a hard link keeps this snapshot intact and avoids copying
+        # the whole SVG when /tmp shares a filesystem with DATA_DIR.
+        os.link(svg_source, working_src)
+    except OSError:
+        _copy_working_file(svg_source, working_src)
 
     fixed_path = working_src.with_name(f"{working_src.stem}-fixed.svg")
     page_flag = page.lower() if page and page.lower() in {"a3", "a4", "a5", "a6"} else "a5"
     use_path = working_src
-    if not OFFLINE_MODE:
-        try:
-            vp = subprocess.run(
-                [
-                    "vpype",
-                    "read",
-                    str(working_src),
-                    "write",
-                    "--page-size",
-                    page_flag,
-                    "--center",
-                    str(fixed_path),
-                ],
-                capture_output=True,
-                text=True,
-            )
-            use_path = fixed_path if vp.returncode == 0 else working_src
-            if vp.returncode != 0:
-                logger.warning("vpype exited with %s; falling back to original SVG", vp.returncode)
-                if vp.stderr:
-                    logger.debug("vpype stderr: %s", vp.stderr.strip())
-        except FileNotFoundError:
-            logger.warning("vpype command not found; skipping centering step")
+    if not OFFLINE_MODE and _center_with_vpype(working_src, fixed_path, page_flag):
+        use_path = fixed_path
+    use_path_str = os.fspath(use_path)
+    current_name = os.path.basename(use_path_str)
 
     cmd = [*_nextdraw_base()]
     cmd.extend([
-        str(use_path),
+        use_path_str,
         "--speed_pendown",
         str(s_down),
         "--speed_penup",
@@ -416,15 +862,16 @@ def _start_plot_from_path(
 
     if OFFLINE_MODE:
         logger.info("Offline mode: command not executed.")
-        JOB["proc"] = None
-        current_name = os.path.basename(use_path)
-        JOB["file"] = current_name
-        JOB["progress"] = 100.0
-        JOB["start_time"] = time.time()
-        JOB["end_time"] = JOB["start_time"]
-        JOB["distance_mm"] = JOB.get("distance_mm") or _estimate_distance_mm(use_path)
-        JOB["elapsed_override"] = 0.0
-        JOB["error"] = None
+        distance_mm = JOB.distance_mm or _estimate_distance_mm(use_path, svg_source)
+        with JOB.lock:
+            JOB.proc = None
+            JOB.file = current_name
+            JOB.progress = 100.0
+            JOB.start_time = time.monotonic()
+            JOB.end_time = JOB.start_time
+            JOB.distance_mm = distance_mm
+            JOB.elapsed_override = 0.0
+            JOB.error = None
         return {
             "ok": True,
             "pid": 0,
@@ -440,52 +887,64 @@ def _start_plot_from_path(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
+        # Raw binary pipe: _watch_plot_progress reads it in large chunks and
+        # splits lines itself.
+        bufsize=0,
     )
-    JOB["proc"] = proc
-    current_name = os.path.basename(use_path)
-    if JOB.get("file") != current_name:
-        JOB["distance_mm"] = None
-    JOB["file"] = current_name
-    JOB["progress"] = 0.0
-    JOB["start_time"] = time.time()
-    JOB["end_time"] = None
-    if JOB.get("distance_mm") is None:
-        JOB["distance_mm"] = _estimate_distance_mm(use_path)
-    JOB["elapsed_override"] = None
-
-    # If the process exits immediately, capture output and respond with the failure.
-    time.sleep(0.2)
-    returncode = proc.poll()
+    with JOB.lock:
+        JOB.proc = proc
+        if JOB.file != current_name:
+            JOB.distance_mm = None
+        JOB.file = current_name
+        JOB.progress = 0.0
+        JOB.start_time = time.monotonic()
+        JOB.end_time = None
+        JOB.elapsed_override = None
+    # Estimated outside the lock; usually a cache hit from the preview.
+    if JOB.distance_mm is None:
+        JOB.distance_mm = _estimate_distance_mm(use_path, svg_source)
+
+    # If the process exits immediately, capture output and respond with the
+    # failure. wait() returns as soon as it exits rather than after a fixed sleep.
+    try:
+        returncode = proc.wait(timeout=0.1)
+    except subprocess.TimeoutExpired:
+        returncode = None
     if returncode is not None:
         stdout_data, _ = proc.communicate()
-        output_text = (stdout_data or "").strip()
-        JOB["proc"] = None
-        JOB["end_time"] = time.time()
-        JOB["elapsed_override"] = None
-        if returncode == 0:
-            suspicious = output_text.lower()
-            if output_text and (
+        output_text = (stdout_data or b"").decode("utf-8", "replace").strip()
+        suspicious = output_text.lower()
+        failed = returncode != 0 or (
+            bool(output_text)
+            and (
                 "error" in suspicious
                 or "no nextdraw" in suspicious
                 or "no devices" in suspicious
-            ):
-                JOB["progress"] = None
-                JOB["error"] = output_text
+            )
+        )
+        with JOB.lock:
+            JOB.proc = None
+            JOB.end_time = time.monotonic()
+            JOB.elapsed_override = None
+            if failed:
+                JOB.progress = None
+                JOB.error = output_text or f"nextdraw exited with code {returncode}"
+            else:
+                JOB.progress = 100.0
+                JOB.error = None
+        if returncode == 0:
+            if failed:
                 logger.error(
                     "nextdraw reported an error despite exit code 0: %s",
                     output_text,
                 )
                 raise HTTPException(status_code=500, detail=output_text)
 
-            JOB["progress"] = 100.0
-            JOB["error"] = None
             logger.info("nextdraw completed immediately with code 0%s", " (no output)" if not output_text else "")
             response: dict[str, Any] = {
                 "ok": True,
                 "pid": proc.pid,
-                "file": JOB["file"],
+                "file": JOB.file,
                 "cmd": cmd_str,
                 "page": page_flag,
                 "completed": True,
@@ -494,14 +953,12 @@ def _start_plot_from_path(
                 response["output"] = output_text
             return response
 
-        JOB["progress"] = None
-        JOB["error"] = output_text or f"nextdraw exited with code {returncode}"
         logger.error(
             "nextdraw exited immediately with code %s: %s",
             returncode,
             output_text,
         )
-        raise HTTPException(status_code=500, detail=JOB["error"])
+        raise HTTPException(status_code=500, detail=JOB.error)
 
     if proc.stdout is not None:
         threading.Thread(target=_watch_plot_progress, args=(proc,), daemon=True).start()
@@ -509,7 +966,7 @@ def _start_plot_from_path(
     return {
         "ok": True,
         "pid": proc.pid,
-        "file": JOB["file"],
+        "file": JOB.file,
         "cmd": cmd_str,
         "page": page_flag,
     }
@@ -542,38 +999,15 @@ def _parse_length_to_mm(value: str | None) -> float | None:
     if not text:
         return None
 
-    match = re.match(r"^([+-]?(?:\d+\.\d+|\d+|\.\d+)(?:[eE][+-]?\d+)?)\s*([a-zA-Z%]*)$", text)
+    match = LENGTH_RE.match(text)
     if not match:
         return None
 
-    numeric = float(match.group(1))
-    unit = match.group(2).lower()
-
-    factors = {
-        "": 1.0,
-        "mm": 1.0,
-        "millimeter": 1.0,
-        "millimeters": 1.0,
-        "cm": 10.0,
-        "centimeter": 10.0,
-        "centimeters": 10.0,
-        "m": 1000.0,
-        "meter": 1000.0,
-        "meters": 1000.0,
-        "in": 25.4,
-        "inch": 25.4,
-        "inches": 25.4,
-        "pt": 25.4 / 72.0,
-        "pc": 25.4 / 6.0,
-        "px": 25.4 / 96.0,
-        "q": 0.25,
-    }
-
-    factor = factors.get(unit)
+    factor = _LENGTH_FACTORS.get(match.group(2).casefold())
     if factor is None:
         return None
 
-    return numeric * factor
+    return float(match.group(1)) * factor
 
 
 __all__ = [
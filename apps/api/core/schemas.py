@@ -1,5 +1,5 @@
 from fastapi import HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class RotateRequest(BaseModel):
@@ -47,3 +47,12 @@ class PlotRequest(BaseModel):
             return 3
         return None
 
+
+class BatchItem(BaseModel):
+    id: str
+    url: str
+    method: str = "GET"
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(..., max_length=32)
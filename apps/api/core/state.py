@@ -1,15 +1,75 @@
-from core.config import DATA_DIR
-import time
-
-JOB = {
-    "proc": None,
-    "file": None,
-    "progress": None,
-    "start_time": None,
-    "end_time": None,
-    "distance_mm": None,
-    "error": None,
-}
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class JobSnapshot:
+    """Consistent copy of the job fields, taken under ``JobState.lock``."""
+
+    proc: Optional[subprocess.Popen]
+    file: Optional[str]
+    progress: Optional[float]
+    start_time: Optional[float]
+    end_time: Optional[float]
+    distance_mm: Optional[float]
+    elapsed_override: Optional[float]
+    error: Optional[str]
+    version: int
+
+
+@dataclass(slots=True)
+class JobState:
+    """State of the current (or last) plot job.
+
+    Fields are written from request handlers and the progress watcher
+    thread. Hold ``lock`` (re-entrant) around related writes so readers
+    using ``snapshot()`` never see a half-updated job.
+    """
+
+    proc: Optional[subprocess.Popen] = None
+    file: Optional[str] = None
+    progress: Optional[float] = None
+    # time.monotonic() readings; only ever compared with each other.
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+    distance_mm: Optional[float] = None
+    elapsed_override: Optional[float] = None
+    error: Optional[str] = None
+    # Bumped on every field change; lets /plot/status answer 304s.
+    version: int = 0
+    lock: threading.RLock = field(
+        default_factory=threading.RLock, init=False, repr=False, compare=False
+    )
+
+    def __setattr__(self, name: str, value) -> None:
+        lock = getattr(self, "lock", None)
+        if lock is None:
+            # Still inside __init__
+            object.__setattr__(self, name, value)
+            return
+        with lock:
+            if name != "version" and getattr(self, name) != value:
+                object.__setattr__(self, "version", self.version + 1)
+            object.__setattr__(self, name, value)
+
+    def snapshot(self) -> JobSnapshot:
+        with self.lock:
+            return JobSnapshot(
+                self.proc,
+                self.file,
+                self.progress,
+                self.start_time,
+                self.end_time,
+                self.distance_mm,
+                self.elapsed_override,
+                self.error,
+                self.version,
+            )
+
+
+JOB = JobState()
 
 # Session state for synchronizing dashboard across multiple devices
 SESSION_STATE = {
@@ -1,13 +1,128 @@
+import contextlib
+import json
+import os
 import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any
 from fastapi import HTTPException
 
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+# Process umask, read once at import (os.umask can only be read by setting
+# it, which would race with other threads later on).
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
 def _sanitize_filename(name: str) -> str:
     """Sanitize and validate an uploaded SVG filename."""
     if not name:
         raise HTTPException(status_code=400, detail="Filename is required")
     candidate = Path(name).name
-    safe = re.sub(r"[^A-Za-z0-9._-]", "_", candidate)
+    safe = _UNSAFE_FILENAME_RE.sub("_", candidate)
     if not safe.lower().endswith(".svg"):
         raise HTTPException(status_code=400, detail="Only .svg files are supported")
-    return safe
\ No newline at end of file
+    return safe
+
+class _LRUCache:
+    """Thread-safe mapping capped at ``maxsize`` entries, least recent evicted first."""
+
+    __slots__ = ("maxsize", "_data", "_lock")
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[Any, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Any, value: Any, replace: bool = True) -> None:
+        """Store ``value``; with ``replace=False`` an existing entry is kept."""
+        with self._lock:
+            if replace or key not in self._data:
+                self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _compile_linear(pattern: str):
+    """Compile ``pattern`` with RE2 when installed, else with ``re``.
+
+    For patterns applied to user-supplied attribute values: RE2 matches in
+    linear time however the input is shaped. Only use syntax both engines
+    accept (no backreferences or lookaround).
+    """
+    if re2 is not None:
+        return re2.compile(pattern)
+    return re.compile(pattern)
+
+
+def _read_json(path: Path) -> Any:
+    """Parse a JSON file, with orjson when installed."""
+    data = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@contextlib.contextmanager
+def _replacing(path: Path):
+    """Yield a binary handle whose contents replace ``path`` on success.
+
+    Writes beside the original and swaps it in with ``os.replace``, so readers
+    never see a half-written file and hard links to the old inode (the plot
+    working copy) keep the old contents. An existing file's mode is kept; a
+    new one gets the mode ``open()`` would give it.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            yield handle
+        try:
+            shutil.copymode(path, tmp_name)
+        except FileNotFoundError:
+            # mkstemp creates 0600
+            os.chmod(tmp_name, 0o666 & ~_UMASK)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _write_json(path: Path, data: Any, indent: int | None = None) -> None:
+    """Write JSON beside ``path`` and rename it into place.
+
+    Readers see either the old document or the new one, never a truncated
+    file, so a crash mid-write cannot corrupt saved state.
+    """
+    if orjson is not None and indent in (None, 2):
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    else:
+        payload = json.dumps(data, indent=indent).encode()
+    with _replacing(path) as handle:
+        handle.write(payload)
@@ -1,7 +1,13 @@
+import atexit
 import logging
+import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from types import MappingProxyType
+from typing import BinaryIO
 
 # ============================================================
 # Dynamic Path Fix — must be BEFORE any local imports
@@ -17,21 +23,38 @@ for path in [CURRENT_DIR, PARENT_DIR]:
 # ============================================================
 # Now safe to import local modules
 # ============================================================
-from fastapi import FastAPI, Request
+from urllib.parse import urlsplit
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 import time
 
 from version import __version__
-from core.config import DATA_DIR, cors_origins, OFFLINE_MODE, dashboard_origin_regex
+from core.config import DATA_DIR, cors_origins, OFFLINE_MODE, DASHBOARD_ORIGIN_REGEX, DEBUG_REQUESTS
+from core.schemas import BatchRequest
 from routes import svg, plot, config, session, settings
 
 # ============================================================
 # Logging Setup
 # ============================================================
+# Handlers run on a listener thread; request handlers and the event loop
+# only enqueue records instead of writing to stderr themselves.
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+# QueueHandler formats each record before enqueueing it, so the stream
+# handler just writes the finished message.
+_log_listener = QueueListener(_log_queue, logging.StreamHandler(), respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# force: importing vpype (via routes) logs through the root logger, which
+# installs a default stderr handler before this runs.
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    handlers=[QueueHandler(_log_queue)],
+    force=True,
 )
 
 logging.getLogger("uvicorn").setLevel(logging.WARNING)
@@ -46,30 +69,43 @@ logger = logging.getLogger("plotterstudio.api")
 ET.register_namespace("", "http://www.w3.org/2000/svg")
 ET.register_namespace("xlink", "http://www.w3.org/1999/xlink")
 
-app = FastAPI(title="Plotter Studio", version=__version__)
+# orjson renders the dict payloads (status polls especially) several times
+# faster than the stdlib encoder; keep working from a bare checkout without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+app = FastAPI(
+    title="Plotter Studio",
+    version=__version__,
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse,
+)
 
 # ============================================================
 # Request Logging Middleware
 # ============================================================
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         logger.info("→ %s %s", request.method, request.url.path)
-        logger.info("  Headers: %s", dict(request.headers))
         if request.url.query:
             logger.info("  Query: %s", request.url.query)
         
         try:
             response = await call_next(request)
-            process_time = time.time() - start_time
+            process_time = (time.perf_counter_ns() - start_ns) / 1e9
             logger.info("← %s %s - %d (%.3fs)", request.method, request.url.path, response.status_code, process_time)
             return response
         except Exception as exc:
-            process_time = time.time() - start_time
+            process_time = (time.perf_counter_ns() - start_ns) / 1e9
             logger.exception("✗ %s %s - ERROR after %.3fs: %s", request.method, request.url.path, process_time, type(exc).__name__)
             raise
 
-app.add_middleware(RequestLoggingMiddleware)
+# Only installed when debugging: it wraps every request (status polls
+# included) in an extra task and writes three log lines for it.
+if DEBUG_REQUESTS:
+    app.add_middleware(RequestLoggingMiddleware)
 
 # ============================================================
 # CORS + Routes
@@ -77,10 +113,13 @@ app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins(),
-    allow_origin_regex=dashboard_origin_regex(),
+    allow_origin_regex=DASHBOARD_ORIGIN_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists let Starlette answer preflights from a fixed header set
+    # instead of echoing the request's; max_age lets browsers cache them.
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Content-Type", "If-None-Match"],
+    max_age=86400,
 )
 
 app.include_router(svg.router)
@@ -104,19 +143,79 @@ def version():
     return {"version": __version__}
 
 
+# Read-only endpoints the dashboard polls, servable in one /batch round trip.
+_BATCH_HANDLERS = MappingProxyType({
+    "/status": status,
+    "/version": version,
+    "/plot/status": lambda: plot._job_status()[1],
+    "/session/state": session.get_session_state,
+})
+
+
+@app.post("/batch")
+def batch(request: BatchRequest):
+    """Run several polled GET endpoints in one request."""
+    responses = []
+    for item in request.requests:
+        handler = _BATCH_HANDLERS.get(urlsplit(item.url).path)
+        if item.method.upper() != "GET":
+            code, body = 405, {"detail": "Method Not Allowed"}
+        elif handler is None:
+            code, body = 404, {"detail": "Not Found"}
+        else:
+            try:
+                code, body = 200, handler()
+            except HTTPException as exc:
+                code, body = exc.status_code, {"detail": exc.detail}
+        responses.append({"id": item.id, "status": code, "body": body})
+    return {"responses": responses}
+
+
+# Block size for reading the log backwards.
+_LOG_TAIL_BLOCK = 8192
+
+
+def _tail_lines(handle: BinaryIO, count: int) -> tuple[list[str], int | None]:
+    """Return the last ``count`` lines of a binary file, reading from the end.
+
+    Also returns the file's line count when the backwards read happened to
+    cover the whole file, else ``None``; counting would mean reading it all.
+    """
+    position = handle.seek(0, os.SEEK_END)
+    if count <= 0:
+        return [], None
+    blocks: list[bytes] = []
+    newlines = 0
+    # One extra newline guarantees the first returned line is complete.
+    while position > 0 and newlines <= count:
+        step = min(_LOG_TAIL_BLOCK, position)
+        position -= step
+        handle.seek(position)
+        block = handle.read(step)
+        blocks.append(block)
+        newlines += block.count(b"\n")
+    all_lines = b"".join(reversed(blocks)).splitlines(keepends=True)
+    total = len(all_lines) if position == 0 else None
+    return [line.decode("utf-8", "replace") for line in all_lines[-count:]], total
+
+
 @app.get("/debug/logs")
 def get_recent_logs(lines: int = 50):
-    """Get recent log entries from the API log file."""
+    """Get recent log entries from the API log file.
+
+    ``total_lines`` is only known for logs small enough to be read whole by
+    the tail; otherwise it is null and ``size_bytes`` gives the file size.
+    """
     log_file = Path("/tmp/plotterstudio-api.log")
     if not log_file.exists():
         return {"error": "Log file not found", "path": str(log_file)}
     
     try:
-        with log_file.open("r") as f:
-            all_lines = f.readlines()
-            recent = all_lines[-lines:] if len(all_lines) > lines else all_lines
+        with log_file.open("rb") as f:
+            recent, total = _tail_lines(f, lines)
             return {
-                "total_lines": len(all_lines),
+                "total_lines": total,
+                "size_bytes": os.fstat(f.fileno()).st_size,
                 "returned_lines": len(recent),
                 "logs": recent
             }
@@ -128,6 +227,6 @@ def get_recent_logs(lines: int = 50):
 # Init Logging
 # ============================================================
 logger.info("Plotter Studio API initialized.")
-logger.info(f"Data directory: {DATA_DIR}")
+logger.info("Data directory: %s", DATA_DIR)
 if OFFLINE_MODE:
     logger.warning("Offline mode enabled - nextdraw commands will be skipped.")
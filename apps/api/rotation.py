@@ -1,10 +1,21 @@
+import functools
 import math
 import re
+import shutil
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from types import MappingProxyType
 from fastapi import HTTPException
 import logging
 
+from core.files import (
+    SVG_PARSE_ERRORS,
+    _ROOT_TAG_RE,
+    _XML_ATTR_RE,
+    _parse_svg_tree,
+)
+from core.utils import _compile_linear, _replacing
+
 logger = logging.getLogger("plotterstudio.rotation")
 
 # --- Rotation metadata constants ---
@@ -14,6 +25,24 @@ ROTATION_BASE_VIEWBOX_ATTR = "data-plotterstudio-base-viewbox"
 ROTATION_BASE_WIDTH_ATTR = "data-plotterstudio-base-width"
 ROTATION_BASE_HEIGHT_ATTR = "data-plotterstudio-base-height"
 
+# --- Parsing patterns ---
+_LENGTH_RE = _compile_linear(r"^([+-]?(?:\d+\.\d+|\d+|\.\d+)(?:[eE][+-]?\d+)?)([a-zA-Z%]*)$")
+_VIEWBOX_SPLIT_RE = re.compile(r"[\s,]+")
+
+# How far into the file the root and wrapper opening tags are looked for
+_TAG_SCAN_LIMIT = 64 * 1024
+_COMMENT_OR_ELEMENT_RE = re.compile(rb"<!--|<[A-Za-z_]")
+
+# Unit -> px factors for SVG length attributes
+_PX_FACTORS = MappingProxyType({
+    "": 1.0,
+    "px": 1.0,
+    "mm": 96.0 / 25.4,
+    "cm": 96.0 / 2.54,
+    "in": 96.0,
+    "pt": 96.0 / 72.0,
+})
+
 # --- Utility functions ---
 
 def _svg_namespace(tag: str) -> str:
@@ -28,29 +57,21 @@ def _parse_length_to_px(value: str | None) -> float | None:
         return None
 
     text = value.strip()
-    match = re.match(r"^([+-]?(?:\d+\.\d+|\d+|\.\d+)(?:[eE][+-]?\d+)?)([a-zA-Z%]*)$", text)
+    match = _LENGTH_RE.match(text)
     if not match:
         return None
 
     numeric = float(match.group(1))
     unit = match.group(2).lower()
 
-    factors = {
-        "": 1.0,
-        "px": 1.0,
-        "mm": 96.0 / 25.4,
-        "cm": 96.0 / 2.54,
-        "in": 96.0,
-        "pt": 96.0 / 72.0,
-    }
-    factor = factors.get(unit)
+    factor = _PX_FACTORS.get(unit)
     return numeric * factor if factor else None
 
 def _ensure_viewbox(root: ET.Element) -> tuple[float, float, float, float]:
     """Ensure the SVG root has a viewBox and return (min_x, min_y, width, height)."""
     viewbox = root.get("viewBox")
     if viewbox:
-        parts = re.split(r"[\s,]+", viewbox.strip())
+        parts = _VIEWBOX_SPLIT_RE.split(viewbox.strip())
         if len(parts) == 4:
             try:
                 return tuple(map(float, parts))
@@ -68,18 +89,154 @@ def _ensure_viewbox(root: ET.Element) -> tuple[float, float, float, float]:
 def _ensure_rotation_wrapper(root: ET.Element) -> ET.Element:
     """Ensure a <g> wrapper exists around SVG content for rotation."""
     ns = _svg_namespace(root.tag)
-    for child in list(root):
-        if child.tag == f"{ns}g" and child.attrib.get("id") == ROTATION_WRAPPER_ID:
-            return child
+    existing = root.find(f"{ns}g[@id='{ROTATION_WRAPPER_ID}']")
+    if existing is not None:
+        return existing
 
-    wrapper = ET.Element(f"{ns}g")
+    # makeelement and detach-then-extend behave the same on ElementTree and
+    # lxml elements; one slice delete avoids a linear remove() per child.
+    wrapper = root.makeelement(f"{ns}g", {})
     wrapper.set("id", ROTATION_WRAPPER_ID)
-    for child in list(root):
-        wrapper.append(child)
-        root.remove(child)
+    children = list(root)
+    del root[:]
+    wrapper.extend(children)
     root.append(wrapper)
     return wrapper
 
+def _format_coord(value: float) -> str:
+    """Six-decimal fixed point without trailing zeros (``50``, ``12.5``)."""
+    text = f"{value:.6f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+def _rotation_update(
+    base_viewbox: str, current_angle: int, normalized: int
+) -> tuple[int, str, str | None]:
+    """Return ``(total_angle, viewBox, transform)`` after turning by ``normalized``."""
+    base_min_x, base_min_y, base_w, base_h = map(float, _VIEWBOX_SPLIT_RE.split(base_viewbox.strip()))
+
+    base_cx = base_min_x + base_w / 2.0
+    base_cy = base_min_y + base_h / 2.0
+
+    total_angle = (current_angle % 360 + normalized) % 360
+
+    # Rotate bounding box: the AABB of a box rotated about its own centre
+    # keeps that centre and spans |w cos| + |h sin| by |w sin| + |h cos|.
+    # Quarter turns (all the API issues) reduce to keeping or swapping sides.
+    if total_angle in {0, 180}:
+        new_width, new_height = base_w, base_h
+    elif total_angle in {90, 270}:
+        new_width, new_height = base_h, base_w
+    else:
+        angle_rad = math.radians(total_angle)
+        abs_cos, abs_sin = abs(math.cos(angle_rad)), abs(math.sin(angle_rad))
+        new_width = base_w * abs_cos + base_h * abs_sin
+        new_height = base_w * abs_sin + base_h * abs_cos
+    new_min_x = base_cx - new_width / 2.0
+    new_min_y = base_cy - new_height / 2.0
+
+    viewbox = " ".join(map(_format_coord, (new_min_x, new_min_y, new_width, new_height)))
+    transform = None if total_angle == 0 else f"rotate({total_angle},{base_cx},{base_cy})"
+    return total_angle, viewbox, transform
+
+@functools.lru_cache(maxsize=None)
+def _attr_pattern(name: str) -> re.Pattern[bytes]:
+    """Compiled matcher for ``name="..."`` inside a raw tag (few distinct names)."""
+    return re.compile(rb"\s" + re.escape(name.encode()) + rb"\s*=\s*(?:\"[^\"]*\"|'[^']*')")
+
+def _set_tag_attrs(tag: bytes, updates: dict[str, bytes | None]) -> bytes:
+    """Set (or drop, for ``None``) attributes on a raw opening tag ending in ``>``."""
+    for name, value in updates.items():
+        pattern = _attr_pattern(name)
+        if value is None:
+            tag = pattern.sub(b"", tag, count=1)
+            continue
+        replacement = b" " + name.encode() + b'="' + value + b'"'
+        tag, count = pattern.subn(lambda _: replacement, tag, count=1)
+        if not count:
+            tag = tag[:-1] + replacement + b">"
+    return tag
+
+
+def _find_element_start(head: bytes, pos: int = 0) -> int | None:
+    """Offset of the next start tag at or after ``pos``, skipping comments.
+
+    Editors put generator comments before ``<svg>``; skipping them in place
+    (rather than stripping them) keeps offsets valid for splicing.
+    """
+    while True:
+        match = _COMMENT_OR_ELEMENT_RE.search(head, pos)
+        if match is None:
+            return None
+        if match.group() != b"<!--":
+            return match.start()
+        end = head.find(b"-->", match.end())
+        if end < 0:
+            return None
+        pos = end + 3
+
+
+def _rotate_wrapped_in_place(path: Path, normalized: int) -> bool:
+    """Re-rotate an SVG this module already wrapped by patching two opening tags.
+
+    Only the root ``<svg>`` and wrapper ``<g>`` attributes change after the
+    first rotation, so the path data is copied through byte for byte rather
+    than parsed and re-serialized. Returns ``False`` when the file is not in
+    that shape and needs the full ElementTree path.
+    """
+    try:
+        with path.open("rb") as handle:
+            head = handle.read(_TAG_SCAN_LIMIT)
+    except OSError:
+        return False
+
+    start = _find_element_start(head)
+    root = _ROOT_TAG_RE.match(head, start) if start is not None else None
+    if not root or not root.group(1).lower().endswith(b"svg") or root.group(2).endswith(b"/"):
+        return False
+    start = _find_element_start(head, root.end())
+    wrapper = _ROOT_TAG_RE.match(head, start) if start is not None else None
+    if not wrapper or head[root.end():wrapper.start()].strip():
+        return False
+    if wrapper.group(1).split(b":")[-1] != b"g" or wrapper.group(2).endswith(b"/"):
+        return False
+
+    attrs = {name: double or single for name, double, single in _XML_ATTR_RE.findall(wrapper.group(2))}
+    if attrs.get(b"id") != ROTATION_WRAPPER_ID.encode():
+        return False
+    try:
+        base_viewbox = attrs[ROTATION_BASE_VIEWBOX_ATTR.encode()].decode("ascii")
+        base_width = attrs[ROTATION_BASE_WIDTH_ATTR.encode()]
+        base_height = attrs[ROTATION_BASE_HEIGHT_ATTR.encode()]
+        current_angle = int(attrs[ROTATION_ANGLE_ATTR.encode()])
+        total_angle, viewbox, transform = _rotation_update(base_viewbox, current_angle, normalized)
+    except (KeyError, UnicodeDecodeError, ValueError):
+        return False
+    if b'"' in base_width or b'"' in base_height:
+        return False
+
+    # Swap width/height on 90° and 270°
+    if total_angle % 180 == 90:
+        base_width, base_height = base_height, base_width
+    root_tag = _set_tag_attrs(root.group(0), {
+        "viewBox": viewbox.encode(),
+        "width": base_width,
+        "height": base_height,
+    })
+    wrapper_tag = _set_tag_attrs(wrapper.group(0), {
+        "transform": transform.encode() if transform else None,
+        ROTATION_ANGLE_ATTR: str(total_angle).encode(),
+    })
+
+    with _replacing(path) as out, path.open("rb") as src:
+        out.write(head[:root.start()])
+        out.write(root_tag)
+        out.write(head[root.end():wrapper.start()])
+        out.write(wrapper_tag)
+        out.write(head[wrapper.end():])
+        src.seek(len(head))
+        shutil.copyfileobj(src, out, 1024 * 1024)
+    return True
+
 # --- Main rotation logic ---
 
 def rotate_svg_file(path: Path, angle: int) -> None:
@@ -90,9 +247,12 @@ def rotate_svg_file(path: Path, angle: int) -> None:
     if normalized == 0:
         return
 
+    if _rotate_wrapped_in_place(path, normalized):
+        return
+
     try:
-        tree = ET.parse(path)
-    except ET.ParseError as exc:
+        tree = _parse_svg_tree(path)
+    except SVG_PARSE_ERRORS as exc:
         raise HTTPException(status_code=400, detail="Invalid SVG content") from exc
 
     root = tree.getroot()
@@ -108,36 +268,10 @@ def rotate_svg_file(path: Path, angle: int) -> None:
 
     # Parse stored metadata
     base_viewbox = wrapper.attrib.get(ROTATION_BASE_VIEWBOX_ATTR, f"{min_x} {min_y} {base_w} {base_h}")
-    base_min_x, base_min_y, base_w, base_h = map(float, re.split(r"[\s,]+", base_viewbox.strip()))
-
-    base_cx = base_min_x + base_w / 2.0
-    base_cy = base_min_y + base_h / 2.0
-
-    current_angle = int(wrapper.attrib.get(ROTATION_ANGLE_ATTR, "0")) % 360
-    total_angle = (current_angle + normalized) % 360
-
-    # Rotate bounding box
-    angle_rad = math.radians(total_angle)
-    cos_a, sin_a = math.cos(angle_rad), math.sin(angle_rad)
-
-    corners = [
-        (base_min_x, base_min_y),
-        (base_min_x + base_w, base_min_y),
-        (base_min_x, base_min_y + base_h),
-        (base_min_x + base_w, base_min_y + base_h),
-    ]
-    rotated = [
-        (cos_a * (x - base_cx) - sin_a * (y - base_cy) + base_cx,
-         sin_a * (x - base_cx) + cos_a * (y - base_cy) + base_cy)
-        for x, y in corners
-    ]
-
-    new_min_x = min(p[0] for p in rotated)
-    new_max_x = max(p[0] for p in rotated)
-    new_min_y = min(p[1] for p in rotated)
-    new_max_y = max(p[1] for p in rotated)
+    current_angle = int(wrapper.attrib.get(ROTATION_ANGLE_ATTR, "0"))
+    total_angle, viewbox, transform = _rotation_update(base_viewbox, current_angle, normalized)
 
-    root.set("viewBox", f"{new_min_x:.6f} {new_min_y:.6f} {new_max_x - new_min_x:.6f} {new_max_y - new_min_y:.6f}")
+    root.set("viewBox", viewbox)
 
     # Swap width/height on 90° and 270°
     if total_angle % 180 in {90, 270}:
@@ -148,10 +282,11 @@ def rotate_svg_file(path: Path, angle: int) -> None:
         root.set("height", wrapper.attrib.get(ROTATION_BASE_HEIGHT_ATTR, root.get("height", "")))
 
     # Update transform
-    if total_angle == 0:
+    if transform is None:
         wrapper.attrib.pop("transform", None)
     else:
-        wrapper.set("transform", f"rotate({total_angle},{base_cx},{base_cy})")
+        wrapper.set("transform", transform)
 
     wrapper.set(ROTATION_ANGLE_ATTR, str(total_angle))
-    tree.write(path, encoding="utf-8", xml_declaration=True)
\ No newline at end of file
+    with _replacing(path) as out:
+        tree.write(out, encoding="utf-8", xml_declaration=True)
@@ -1,4 +1,3 @@
-import json
 import logging
 from pathlib import Path
 from typing import Any
@@ -7,12 +6,16 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from core.config import DEFAULT_HOME
+from core.utils import _read_json, _write_json
 
 router = APIRouter(prefix="/config", tags=["config"])
 logger = logging.getLogger("plotterstudio.api")
 
 CONFIG_FILE = DEFAULT_HOME / "config.json"
 
+# Last parsed config, keyed by the file's (st_mtime_ns, st_size).
+_CONFIG_CACHE: tuple[tuple[int, int], dict[str, Any]] | None = None
+
 
 class DeviceConfig(BaseModel):
     selectedDeviceProfile: str | None = None
@@ -21,23 +24,39 @@ class DeviceConfig(BaseModel):
 
 
 def _load_config() -> dict[str, Any]:
-    """Load config from file, return empty dict if file doesn't exist."""
-    if not CONFIG_FILE.exists():
+    """Load config from file, return empty dict if file doesn't exist.
+
+    The parsed file is reused until its mtime or size changes; callers get
+    a shallow copy they are free to modify.
+    """
+    global _CONFIG_CACHE
+    try:
+        stat = CONFIG_FILE.stat()
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        logger.warning("Failed to load config file: %s", e)
         return {}
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _CONFIG_CACHE
+    if cached is not None and cached[0] == key:
+        return dict(cached[1])
     try:
-        with CONFIG_FILE.open("r") as f:
-            return json.load(f)
+        config = _read_json(CONFIG_FILE)
     except Exception as e:
         logger.warning("Failed to load config file: %s", e)
         return {}
+    _CONFIG_CACHE = (key, config)
+    return dict(config)
 
 
 def _save_config(config: dict[str, Any]) -> None:
     """Save config to file."""
+    global _CONFIG_CACHE
+    _CONFIG_CACHE = None
     CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
     try:
-        with CONFIG_FILE.open("w") as f:
-            json.dump(config, f, indent=2)
+        _write_json(CONFIG_FILE, config, indent=2)
     except Exception as e:
         logger.error("Failed to save config file: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to save config: {e}")
@@ -1,23 +1,26 @@
+import asyncio
 import time
 import logging
 import shlex
 from pathlib import Path
 
-from fastapi import APIRouter, Form, HTTPException
+from fastapi import APIRouter, Form, HTTPException, Request, Response
 
 from core.nextdraw import (
     _run_command,
     _manual_response,
 )
 from core.state import JOB
-from core.config import DATA_DIR
-from core.utils import _sanitize_filename
+from core.files import _resolve_upload
 
 router = APIRouter(prefix="/plot", tags=["plot"])
 logger = logging.getLogger("plotterstudio.api")
 
+# How long a cancelled plot gets to exit after SIGTERM before it is killed.
+_CANCEL_GRACE_SECONDS = 3.0
+
 @router.post("")
-def plot(command: str = Form(...)):
+async def plot(command: str = Form(...)):
     """Execute a nextdraw command. The dashboard should build the complete command including all flags."""
     if not command or not command.strip():
         raise HTTPException(status_code=400, detail="Command cannot be empty")
@@ -38,8 +41,8 @@ def plot(command: str = Form(...)):
             # Check if it's already an absolute path
             part_path = Path(part)
             if part_path.is_absolute():
-                # Already a full path, use it as-is
-                if part_path.exists() and part_path.is_file():
+                # Already a full path, use it as-is (is_file() implies exists())
+                if part_path.is_file():
                     logger.info("Using absolute path: %s", part_path)
                     break
                 continue
@@ -52,68 +55,91 @@ def plot(command: str = Form(...)):
             
             # Sanitize and check in DATA_DIR
             try:
-                safe_name = _sanitize_filename(filename)
-                full_path = DATA_DIR / safe_name
-                if full_path.exists() and full_path.is_file():
+                _, full_path = _resolve_upload(filename)
+                if full_path.is_file():
                     # Replace filename with full path
                     parts[i] = str(full_path)
                     logger.info("Resolved filename '%s' to full path: %s", part, full_path)
+                    # Reconstruct command with resolved path
+                    command_str = ' '.join(shlex.quote(p) for p in parts)
+                    logger.info("Command with resolved path: %s", command_str)
                     break
             except HTTPException:
                 # If sanitization fails, skip this part
                 continue
-        
-        # Reconstruct command with resolved path
-        command_str = ' '.join(shlex.quote(str(p)) for p in parts)
-        logger.info("Command with resolved path: %s", command_str)
     
-    result = _run_command(command_str)
+    result = await _run_command(command_str)
     response = _manual_response("command executed", result, error_on_failure=False)
     # Also include the original command string for debugging
     response["original_command"] = command_str
     return response
 
 @router.post("/cancel")
-def cancel():
-    if JOB["proc"] and JOB["proc"].poll() is None:
-        JOB["proc"].terminate()
-        try:
-            JOB["proc"].wait(timeout=3)
-        except Exception:
-            JOB["proc"].kill()
+async def cancel():
+    proc = JOB.proc
+    if proc and proc.poll() is None:
+        proc.terminate()
+        # Poll from the event loop rather than blocking a worker in wait().
+        deadline = time.monotonic() + _CANCEL_GRACE_SECONDS
+        while proc.poll() is None and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if proc.poll() is None:
+            proc.kill()
         # Dashboard should handle raising pen and disabling motors if needed
         # The cancel endpoint just stops the running process
-    JOB["proc"] = None
-    JOB["progress"] = None
-    JOB["end_time"] = time.time()
-    JOB["elapsed_override"] = None
-    JOB["error"] = None
+    with JOB.lock:
+        JOB.proc = None
+        JOB.progress = None
+        JOB.end_time = time.monotonic()
+        JOB.elapsed_override = None
+        JOB.error = None
     return {"ok": True, "message": "Canceled"}
 
-@router.get("/status")
-def status():
-    running = JOB["proc"] is not None and JOB["proc"].poll() is None
-    progress = JOB.get("progress")
+# Last status payload, keyed by (JOB.version, whole second while running).
+_STATUS_SNAPSHOT: tuple[tuple[int, int], dict] | None = None
+
+def _job_status() -> tuple[str, dict]:
+    """Return ``(etag, payload)`` for the current job, reusing the last payload."""
+    global _STATUS_SNAPSHOT
+    job = JOB.snapshot()
+    running = job.proc is not None and job.proc.poll() is None
+    # Elapsed time only moves while running, and then at 1 s resolution.
+    key = (job.version, int(time.monotonic()) if running else 0)
+    etag = f'W/"{key[0]}-{key[1]}"'
+
+    snapshot = _STATUS_SNAPSHOT
+    if snapshot is not None and snapshot[0] == key:
+        return etag, snapshot[1]
+
+    progress = job.progress
     if not running and progress not in (None, 100.0):
         progress = None
-    start_time = JOB.get("start_time")
-    end_time = JOB.get("end_time")
-    elapsed_override = JOB.get("elapsed_override")
+    start_time = job.start_time
+    end_time = job.end_time
+    elapsed_override = job.elapsed_override
     elapsed = None
     if start_time:
         if running:
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
         elif end_time:
             elapsed = end_time - start_time
         if elapsed_override is not None:
             elapsed = float(elapsed_override)
-    distance_mm = JOB.get("distance_mm")
-    return {
+    payload = {
         "running": running,
-        "file": JOB.get("file"),
+        "file": job.file,
         "progress": progress,
         "elapsed_seconds": elapsed,
-        "distance_mm": distance_mm,
-        "error": JOB.get("error"),
+        "distance_mm": job.distance_mm,
+        "error": job.error,
     }
+    _STATUS_SNAPSHOT = (key, payload)
+    return etag, payload
 
+@router.get("/status")
+def status(request: Request, response: Response):
+    etag, payload = _job_status()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return payload
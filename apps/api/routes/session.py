@@ -1,5 +1,5 @@
-import json
 import logging
+import threading
 import time
 from pathlib import Path
 from typing import Any
@@ -7,51 +7,58 @@ from typing import Any
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from core.config import DEFAULT_HOME
+from core.config import SETTINGS_DIR
+from core.state import SESSION_STATE
+from core.utils import _read_json, _write_json
 
 router = APIRouter(prefix="/session", tags=["session"])
 logger = logging.getLogger("plotterstudio.api")
 
-# Settings directory - store session state JSON file here
-SETTINGS_DIR = DEFAULT_HOME / "settings"
-SETTINGS_DIR.mkdir(parents=True, exist_ok=True)
-
 # Session state file path
 SESSION_STATE_FILE = SETTINGS_DIR / "session_state.json"
 
+# Fields exposed by GET /session/state
+_SESSION_FIELDS = ("selected_file", "selected_layer", "last_updated")
+
+# SESSION_STATE is the live copy: read from the file once, written through
+# on every update. The lock serializes updates and keeps reads untorn.
+_SESSION_LOCK = threading.Lock()
+_session_loaded = False
+
 
 def _load_session_state() -> dict[str, Any]:
     """Load session state from file, return default if file doesn't exist."""
     if not SESSION_STATE_FILE.exists():
-        return {
-            "selected_file": None,
-            "selected_layer": None,
-            "last_updated": None,
-        }
+        return dict.fromkeys(_SESSION_FIELDS)
     try:
-        with SESSION_STATE_FILE.open("r") as f:
-            return json.load(f)
+        return _read_json(SESSION_STATE_FILE)
     except Exception as e:
         logger.warning("Failed to load session state file %s: %s", SESSION_STATE_FILE, e)
-        return {
-            "selected_file": None,
-            "selected_layer": None,
-            "last_updated": None,
-        }
+        return dict.fromkeys(_SESSION_FIELDS)
 
 
 def _save_session_state(state: dict[str, Any]) -> None:
     """Save session state to file."""
     try:
         SESSION_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with SESSION_STATE_FILE.open("w") as f:
-            json.dump(state, f, indent=2)
+        # Machine-only file: compact JSON
+        _write_json(SESSION_STATE_FILE, state)
         logger.debug("Saved session state to %s", SESSION_STATE_FILE)
     except Exception as e:
         logger.error("Failed to save session state file %s: %s", SESSION_STATE_FILE, e)
         raise HTTPException(status_code=500, detail=f"Failed to save session state: {e}")
 
 
+def _ensure_session_loaded() -> None:
+    global _session_loaded
+    if _session_loaded:
+        return
+    with _SESSION_LOCK:
+        if not _session_loaded:
+            SESSION_STATE.update(_load_session_state())
+            _session_loaded = True
+
+
 class SessionStateRequest(BaseModel):
     selected_file: str | None = None
     selected_layer: str | None = None
@@ -60,28 +67,28 @@ class SessionStateRequest(BaseModel):
 @router.get("/state")
 def get_session_state() -> dict[str, Any]:
     """Get the current session state (for syncing across devices)."""
-    state = _load_session_state()
-    return {
-        "selected_file": state.get("selected_file"),
-        "selected_layer": state.get("selected_layer"),
-        "last_updated": state.get("last_updated"),
-    }
+    _ensure_session_loaded()
+    with _SESSION_LOCK:
+        return dict(zip(_SESSION_FIELDS, map(SESSION_STATE.get, _SESSION_FIELDS)))
 
 
 @router.post("/state")
 def update_session_state(state: SessionStateRequest) -> dict[str, Any]:
     """Update the session state (for syncing across devices)."""
-    current_state = _load_session_state()
-    
-    # Always update fields - allow None/null values to be set explicitly
-    # This allows "All layers" selection to set selected_layer back to None
-    current_state["selected_file"] = state.selected_file
-    current_state["selected_layer"] = state.selected_layer  # Can be None for "All layers"
-    
-    current_state["last_updated"] = time.time()
-    
-    # Save to file
-    _save_session_state(current_state)
+    _ensure_session_loaded()
+    with _SESSION_LOCK:
+        current_state = dict(SESSION_STATE)
+
+        # Always update fields - allow None/null values to be set explicitly
+        # This allows "All layers" selection to set selected_layer back to None
+        current_state["selected_file"] = state.selected_file
+        current_state["selected_layer"] = state.selected_layer  # Can be None for "All layers"
+
+        current_state["last_updated"] = time.time()
+
+        # Save to file first so a failed write leaves memory and disk in step
+        _save_session_state(current_state)
+        SESSION_STATE.update(current_state)
     
     logger.info("Session state updated: file=%s, layer=%s", state.selected_file, state.selected_layer)
     return {"ok": True, "message": "Session state updated"}
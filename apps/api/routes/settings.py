@@ -1,48 +1,132 @@
-import json
+import atexit
 import logging
+import threading
 from pathlib import Path
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
 from pydantic import BaseModel
 
-from core.config import DEFAULT_HOME
+from core.config import SETTINGS_DIR
+from core.utils import _read_json, _write_json
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 logger = logging.getLogger("plotterstudio.api")
 
-# Settings directory - store all settings JSON files here
-SETTINGS_DIR = DEFAULT_HOME / "settings"
-SETTINGS_DIR.mkdir(parents=True, exist_ok=True)
-
 # Settings file paths
 DEVICE_PRESETS_FILE = SETTINGS_DIR / "device_presets.json"
 PRINT_PRESETS_FILE = SETTINGS_DIR / "print_presets.json"
 SELECTED_PROFILES_FILE = SETTINGS_DIR / "selected_profiles.json"
 
 
+# Last parsed contents per settings file, keyed by (st_mtime_ns, st_size).
+_SETTINGS_CACHE: dict[Path, tuple[tuple[int, int], Any]] = {}
+
+# Saves not yet on disk, newest data per file. Reads consult this first, so
+# a GET right after a POST sees the new settings; repeated saves of one file
+# collapse into a single write. Guarded by _PENDING_CHANGED.
+_PENDING_WRITES: dict[Path, Any] = {}
+_PENDING_CHANGED = threading.Condition()
+_writer_thread: threading.Thread | None = None
+_writer_stopping = False
+_WRITE_RETRY_SECONDS = 5.0
+
+
 def _load_json_file(file_path: Path, default: Any = None) -> Any:
-    """Load JSON from file, return default if file doesn't exist."""
-    if not file_path.exists():
+    """Load JSON from file, return default if file doesn't exist.
+
+    The parsed file is reused until its mtime or size changes, so repeated
+    GETs skip the read and parse. Callers must not modify the result.
+    """
+    with _PENDING_CHANGED:
+        if file_path in _PENDING_WRITES:
+            return _PENDING_WRITES[file_path]
+    try:
+        stat = file_path.stat()
+    except OSError:
         return default if default is not None else {}
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _SETTINGS_CACHE.get(file_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
     try:
-        with file_path.open("r") as f:
-            return json.load(f)
+        data = _read_json(file_path)
     except Exception as e:
         logger.warning("Failed to load settings file %s: %s", file_path, e)
         return default if default is not None else {}
+    _SETTINGS_CACHE[file_path] = (key, data)
+    return data
 
 
-def _save_json_file(file_path: Path, data: Any) -> None:
-    """Save data as JSON to file."""
+def _write_settings_file(file_path: Path, data: Any) -> bool:
+    """Write one settings file to disk; errors are logged and reported as ``False``."""
     try:
         file_path.parent.mkdir(parents=True, exist_ok=True)
-        with file_path.open("w") as f:
-            json.dump(data, f, indent=2)
+        _write_json(file_path, data, indent=2)
         logger.info("Saved settings to %s", file_path)
+        return True
     except Exception as e:
         logger.error("Failed to save settings file %s: %s", file_path, e)
-        raise HTTPException(status_code=500, detail=f"Failed to save settings: {e}")
+        return False
+
+
+def _drain_pending_writes() -> None:
+    """Writer thread: write queued saves until stopped and nothing is left.
+
+    A save that fails stays queued, so readers keep getting it, and is
+    retried after _WRITE_RETRY_SECONDS (once more at shutdown, then dropped).
+    """
+    while True:
+        with _PENDING_CHANGED:
+            while not _PENDING_WRITES and not _writer_stopping:
+                _PENDING_CHANGED.wait()
+            if not _PENDING_WRITES:
+                return
+            batch = list(_PENDING_WRITES.items())
+        failed = False
+        for file_path, data in batch:
+            written = _write_settings_file(file_path, data)
+            failed = failed or not written
+            with _PENDING_CHANGED:
+                # A newer save that arrived mid-write stays queued for another pass.
+                if written and _PENDING_WRITES.get(file_path) is data:
+                    del _PENDING_WRITES[file_path]
+        if failed:
+            with _PENDING_CHANGED:
+                if _writer_stopping:
+                    return
+                _PENDING_CHANGED.wait(_WRITE_RETRY_SECONDS)
+
+
+def _stop_writer() -> None:
+    """Flush queued saves before the interpreter exits."""
+    global _writer_stopping
+    with _PENDING_CHANGED:
+        _writer_stopping = True
+        _PENDING_CHANGED.notify()
+    if _writer_thread is not None:
+        _writer_thread.join(timeout=10)
+
+
+def _save_json_file(file_path: Path, data: Any) -> None:
+    """Queue data to be saved as JSON to file by the writer thread."""
+    global _writer_thread
+    with _PENDING_CHANGED:
+        _PENDING_WRITES[file_path] = data
+        _SETTINGS_CACHE.pop(file_path, None)
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(
+                target=_drain_pending_writes, name="settings-writer", daemon=True
+            )
+            _writer_thread.start()
+            atexit.register(_stop_writer)
+        _PENDING_CHANGED.notify()
+
+
+class BulkSettingsRequest(BaseModel):
+    device_presets: dict[str, Any] | None = None
+    print_presets: dict[str, Any] | None = None
+    selected_profiles: dict[str, str | None] | None = None
 
 
 # Device Presets
@@ -89,3 +173,18 @@ def save_selected_profiles(profiles: dict[str, str | None]) -> dict[str, Any]:
     _save_json_file(SELECTED_PROFILES_FILE, profiles)
     return {"ok": True, "message": "Selected profiles saved"}
 
+
+@router.post("/bulk")
+def save_settings_bulk(settings: BulkSettingsRequest) -> dict[str, Any]:
+    """Save any of the settings files in one request; omitted ones are left as is."""
+    updates = (
+        (DEVICE_PRESETS_FILE, settings.device_presets),
+        (PRINT_PRESETS_FILE, settings.print_presets),
+        (SELECTED_PROFILES_FILE, settings.selected_profiles),
+    )
+    saved = []
+    for file_path, data in updates:
+        if data is not None:
+            _save_json_file(file_path, data)
+            saved.append(file_path.stem)
+    return {"ok": True, "message": "Settings saved", "saved": saved}
@@ -1,125 +1,161 @@
+import asyncio
 import logging
-import xml.etree.ElementTree as ET
+import os
 from pathlib import Path
 from typing import Any
 
-from fastapi import APIRouter, UploadFile, HTTPException, Response, Query
+from fastapi import APIRouter, UploadFile, HTTPException, Request, Response, Query
 from fastapi.responses import FileResponse
 
-from core.utils import _sanitize_filename
-from core.files import _file_metadata, _unique_filename
+from core.utils import _LRUCache, _sanitize_filename
+from core.files import (
+    SVG_PARSE_ERRORS,
+    _check_svg_safe,
+    _file_metadata,
+    _file_metadata_batch,
+    _file_metadata_from_entry,
+    _list_svg_entries,
+    _resolve_upload,
+    _unique_filename,
+    _remember_filename,
+    _release_filename,
+    _forget_filename,
+    _iterparse_svg,
+    _write_upload,
+)
 from core.schemas import RotateRequest, RenameRequest, PlotRequest
-from core.nextdraw import _preview_via_nextdraw, _estimate_distance_mm, _start_plot_from_path
-from core.config import DATA_DIR
+from core.nextdraw import _preview_via_nextdraw, _start_plot_from_path
+from core.config import DATA_DIR, MAX_SVG_BYTES
 from rotation import rotate_svg_file
 
 logger = logging.getLogger("plotterstudio.api.files")
 
 router = APIRouter(prefix="/files", tags=["files"])
 
+# Elements that carry ids but aren't drawable layers
+_NON_LAYER_TAGS = frozenset(
+    {"linearGradient", "radialGradient", "pattern", "clipPath", "mask", "defs"}
+)
+
+_VALID_ROTATIONS = frozenset({0, 90, 180, 270})
+
+# Layer ids keyed by (path, st_mtime_ns, st_size), least recent first. The
+# dashboard asks for layers every time a file is selected; rotation rewrites
+# the file, which changes the key.
+_LAYER_CACHE = _LRUCache(256)
+
+def _stat_upload(filename: str) -> tuple[str, Path, os.stat_result]:
+    """Resolve an uploaded file and stat it once; 404 if it doesn't exist."""
+    safe_name, target = _resolve_upload(filename)
+    try:
+        return safe_name, target, target.stat()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="File not found") from exc
+
+
 @router.get("")
-def list_files():
-    files = [
-        path for path in DATA_DIR.iterdir()
-        if path.is_file() and path.suffix.lower() == ".svg"
-    ]
-    files.sort(key=lambda path: path.name.lower())
-    return [_file_metadata(path) for path in files]
+def list_files(layout: str = Query("rows", pattern="^(rows|columns)$")):
+    """List uploaded SVGs. ``layout=columns`` returns one array per field."""
+    entries = _list_svg_entries()
+    if layout == "columns":
+        return _file_metadata_batch(entries)
+    return [_file_metadata_from_entry(entry) for entry in entries]
 
 
 @router.post("", status_code=201)
 async def upload_file(file: UploadFile):
     import time
-    upload_start = time.time()
+    upload_start = time.perf_counter_ns()
     safe_name = _sanitize_filename(file.filename or "uploaded.svg")
-    final_name = _unique_filename(safe_name)
+    # Sync routes already run in the threadpool; this async one hands its
+    # filesystem work (directory scan, head read) to a thread explicitly.
+    final_name = await asyncio.to_thread(_unique_filename, safe_name)
     target = DATA_DIR / final_name
-
-    logger.info("=" * 60)
-    logger.info("UPLOAD REQUEST STARTED")
-    logger.info("  Original filename: %s", file.filename)
-    logger.info("  Safe name: %s", safe_name)
-    logger.info("  Final name: %s", final_name)
-    logger.info("  Target path: %s", target)
-    logger.info("  Content type: %s", file.content_type)
-    logger.info("  Headers: %s", dict(file.headers) if hasattr(file, 'headers') else 'N/A')
+    # Written beside the target and renamed into place once complete, so
+    # listings never see a half-written SVG (the .part name isn't listed).
+    partial = DATA_DIR / f".{final_name}.part"
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Upload started: original=%s safe=%s final=%s target=%s type=%s headers=%s",
+            file.filename, safe_name, final_name, target, file.content_type,
+            dict(file.headers) if hasattr(file, 'headers') else 'N/A',
+        )
     
     try:
-        bytes_written = 0
-        chunk_count = 0
-        with target.open("wb") as handle:
-            while True:
-                chunk = await file.read(1024 * 1024)
-                if not chunk:
-                    break
-                handle.write(chunk)
-                bytes_written += len(chunk)
-                chunk_count += 1
-        logger.info("  Wrote %d bytes in %d chunks", bytes_written, chunk_count)
+        # Copy off the event loop so large uploads don't stall other requests.
+        await file.seek(0)
+        size = await asyncio.to_thread(_write_upload, file.file, partial, file.size)
+        logger.debug("Wrote %d bytes", size)
+    except HTTPException:
+        partial.unlink(missing_ok=True)
+        _forget_filename(final_name)
+        logger.warning("Upload %s exceeded %d bytes; removing", target, MAX_SVG_BYTES)
+        raise
     except PermissionError as exc:
+        partial.unlink(missing_ok=True)
+        _forget_filename(final_name)
         logger.exception("PERMISSION ERROR while saving %s", target)
         raise HTTPException(status_code=500, detail="Server cannot write to uploads directory") from exc
     except OSError as exc:
+        partial.unlink(missing_ok=True)
+        _forget_filename(final_name)
         logger.exception("OS ERROR writing uploaded file %s", target)
         raise HTTPException(status_code=500, detail="Failed to save uploaded file") from exc
     except Exception as exc:
+        partial.unlink(missing_ok=True)
+        _forget_filename(final_name)
         logger.exception("UNEXPECTED ERROR during file write: %s", type(exc).__name__)
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(exc)}") from exc
 
-    try:
-        size = target.stat().st_size
-        logger.info("  File size on disk: %d bytes", size)
-    except OSError as exc:
-        logger.exception("ERROR: Unable to stat saved file %s", target)
-        target.unlink(missing_ok=True)
-        raise HTTPException(status_code=500, detail="Unable to finalize upload") from exc
-
     if size == 0:
         logger.warning("WARNING: Uploaded file %s was empty; removing", target)
-        target.unlink(missing_ok=True)
+        partial.unlink(missing_ok=True)
+        _forget_filename(final_name)
         raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
-    upload_duration = time.time() - upload_start
-    metadata = _file_metadata(target)
-    logger.info("UPLOAD SUCCESS")
-    logger.info("  File: %s", target.name)
-    logger.info("  Size: %d bytes", size)
-    logger.info("  Duration: %.2f seconds", upload_duration)
-    logger.info("=" * 60)
+    try:
+        os.replace(partial, target)
+    except OSError as exc:
+        logger.exception("ERROR: Unable to move upload into place at %s", target)
+        partial.unlink(missing_ok=True)
+        _forget_filename(final_name)
+        raise HTTPException(status_code=500, detail="Unable to finalize upload") from exc
+    _release_filename(final_name)
+
+    upload_duration = (time.perf_counter_ns() - upload_start) / 1e9
+    metadata = await asyncio.to_thread(_file_metadata, target)
+    logger.info("Uploaded %s (%d bytes) in %.3fs", target.name, size, upload_duration)
     return metadata
 
 @router.delete("/{filename}", status_code=204)
 def delete_file(filename: str):
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    target.unlink()
+    safe_name, target = _resolve_upload(filename)
+    try:
+        target.unlink()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="File not found") from exc
+    _forget_filename(safe_name)
     return Response(status_code=204)
 
 @router.post("/{filename}/rotate", status_code=200)
 def rotate_file(filename: str, request: RotateRequest):
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-
+    # Reject bad angles before touching the filesystem.
     normalized = request.normalized
-    if normalized not in {0, 90, 180, 270}:
+    if normalized not in _VALID_ROTATIONS:
         raise HTTPException(status_code=400, detail="Rotation angle must be a multiple of 90 degrees")
 
+    _, target, stat = _stat_upload(filename)
     if normalized == 0:
         return {"rotated": False, "angle": 0}
 
+    _check_svg_safe(target, stat)
     rotate_svg_file(target, normalized)
     return {"rotated": True, "angle": normalized}
 
 @router.post("/{filename}/rename", status_code=200)
 def rename_file(filename: str, request: RenameRequest):
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
+    safe_name, target, _ = _stat_upload(filename)
 
     new_name = request.sanitized(_sanitize_filename)
     new_path = DATA_DIR / new_name
@@ -134,16 +170,40 @@ def rename_file(filename: str, request: RenameRequest):
         target.rename(new_path)
     except OSError as exc:
         raise HTTPException(status_code=500, detail="Unable to rename file") from exc
+    _forget_filename(safe_name)
+    _remember_filename(new_name)
 
     return _file_metadata(new_path)
 
+def _svg_file_response(request: Request, target: Path, filename: str | None = None) -> Response:
+    """Serve an SVG from disk with a stat-based ETag, answering 304 on a match.
+
+    ``no-cache`` rather than a max-age: clients revalidate every time (cheap
+    with the ETag), so a rotate or re-upload is never masked by a stale copy.
+    """
+    try:
+        stat = target.stat()
+    except OSError as exc:
+        raise HTTPException(status_code=404, detail="File not found") from exc
+    etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return FileResponse(
+        target,
+        media_type="image/svg+xml",
+        filename=filename,
+        stat_result=stat,
+        headers=headers,
+    )
+
 @router.get("/{filename}/download")
-def download_file(filename: str):
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(target, media_type="image/svg+xml", filename=safe_name)
+def download_file(filename: str, request: Request):
+    safe_name, target = _resolve_upload(filename)
+    return _svg_file_response(request, target, filename=safe_name)
 
 @router.get("/{filename}/preview")
 def preview_file(
@@ -152,10 +212,7 @@ def preview_file(
     speed: int = Query(70, ge=1),
     penlift: int | None = Query(None, ge=1, le=3),
 ):
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
+    _, target, _ = _stat_upload(filename)
 
     penlift_value = penlift if penlift in {1, 2, 3} else None
 
@@ -166,56 +223,52 @@ def preview_file(
         penlift=penlift_value,
     )
 
-    # Fall back to intrinsic SVG distance if nextdraw preview isn't available.
-    if est_distance is None:
-        est_distance = _estimate_distance_mm(target)
-
     return {
         "estimated_seconds": est_seconds,
         "distance_mm": est_distance,
     }
 
 @router.get("/{filename}/raw")
-def raw_file(filename: str):
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    return Response(target.read_text(), media_type="image/svg+xml")
+def raw_file(filename: str, request: Request):
+    _, target = _resolve_upload(filename)
+    return _svg_file_response(request, target)
 
 @router.get("/{filename}/layers")
 def get_layers(filename: str):
     """Extract layer IDs from an SVG file. Layers are identified by elements with id attributes."""
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    
+    safe_name, target, stat = _stat_upload(filename)
+    key = (os.fspath(target), stat.st_mtime_ns, stat.st_size)
+    cached = _LAYER_CACHE.get(key)
+    if cached is not None:
+        return {"layers": list(cached)}
+
+    try:
+        _check_svg_safe(target, stat)
+    except HTTPException as exc:
+        logger.warning("Refusing to parse %s for layers: %s", safe_name, exc.detail)
+        return {"layers": []}
+
     try:
-        tree = ET.parse(target)
-        root = tree.getroot()
-        
-        # Find all elements with id attributes
-        layers = []
-        for elem in root.iter():
+        # Stream the document: ids are read on each start event and elements
+        # are cleared on end, so path data never accumulates in a full tree.
+        layers: dict[str, None] = {}
+        for event, elem in _iterparse_svg(target, ("start", "end")):
+            if event == "end":
+                elem.clear()
+                continue
             layer_id = elem.get('id')
             if layer_id:
                 # Filter out common SVG element IDs that aren't typically layers
                 # (like gradients, patterns, etc.)
                 tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                if tag not in ['linearGradient', 'radialGradient', 'pattern', 'clipPath', 'mask', 'defs']:
-                    layers.append(layer_id)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_layers = []
-        for layer_id in layers:
-            if layer_id not in seen:
-                seen.add(layer_id)
-                unique_layers.append(layer_id)
-        
-        return {"layers": unique_layers}
-    except ET.ParseError as exc:
+                if tag not in _NON_LAYER_TAGS:
+                    # dict keys dedupe while preserving order
+                    layers.setdefault(layer_id)
+
+        found = list(layers)
+        _LAYER_CACHE.put(key, found)
+        return {"layers": list(found)}
+    except SVG_PARSE_ERRORS as exc:
         logger.warning("Failed to parse SVG for layers: %s", exc)
         return {"layers": []}
     except Exception as exc:
@@ -225,10 +278,7 @@ def get_layers(filename: str):
 @router.post("/{filename}/plot")
 def plot_file(filename: str, request: PlotRequest):
     """Start plotting an uploaded SVG file."""
-    safe_name = _sanitize_filename(filename)
-    target = DATA_DIR / safe_name
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="File not found")
+    safe_name, target, _ = _stat_upload(filename)
 
     logger.info("Plot request received: layer='%s'", request.layer)
 
@@ -0,0 +1,47 @@
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+
+from core import nextdraw
+
+_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="50mm" height="30mm" viewBox="0 0 50 30">'
+    '<path d="M0 0L10 10 C 20 20 30 0 40 10"/></svg>'
+)
+
+
+@unittest.skipIf(nextdraw.vpype is None, "vpype is not installed")
+class CenterWithVpypeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = Path(self.tmp.name) / "drawing.svg"
+        self.source.write_text(_SVG)
+        self.target = Path(self.tmp.name) / "drawing-fixed.svg"
+
+        root = logging.getLogger()
+        level, handlers = root.level, root.handlers[:]
+
+        def restore():
+            root.setLevel(level)
+            root.handlers[:] = handlers
+
+        self.addCleanup(restore)
+        self.handler = logging.NullHandler()
+        root.handlers = [self.handler]
+        root.setLevel(logging.INFO)
+
+    def test_writes_centred_copy(self):
+        self.assertTrue(nextdraw._center_with_vpype(self.source, self.target, "a5"))
+        self.assertIn('width="14.8cm"', self.target.read_text())
+
+    def test_leaves_root_logger_untouched(self):
+        nextdraw._center_with_vpype(self.source, self.target, "a5")
+        root = logging.getLogger()
+        self.assertEqual(root.level, logging.INFO)
+        self.assertEqual(root.handlers, [self.handler])
+
+
+if __name__ == "__main__":
+    unittest.main()
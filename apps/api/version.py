@@ -1,9 +1,7 @@
 """Application version helpers."""
-from importlib import metadata
 
 __all__ = ["__version__"]
 
-try:
-    __version__ = metadata.version("plotterstudio")
-except metadata.PackageNotFoundError:
-    __version__ = "0.1.0"
+# Keep in sync with ``version`` in pyproject.toml. A constant rather than an
+# importlib.metadata lookup, which scans sys.path for dist-info at startup.
+__version__ = "0.1.0"
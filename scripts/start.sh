@@ -73,6 +73,15 @@ else
     export PLOTTERSTUDIO_PORT="${PLOTTERSTUDIO_PORT:-3333}"
 fi
 
+# Per-request API logging is on by default only in dev mode
+if [ -z "${PLOTTERSTUDIO_DEBUG_REQUESTS:-}" ]; then
+    if [ "$DEV_MODE" = "dev" ]; then
+        export PLOTTERSTUDIO_DEBUG_REQUESTS=1
+    else
+        export PLOTTERSTUDIO_DEBUG_REQUESTS=0
+    fi
+fi
+
 # Default offline behavior depends on script name (dev vs start) unless overridden
 if [ -z "${PLOTTERSTUDIO_OFFLINE:-}" ]; then
     if [ "$DEV_MODE" = "dev" ]; then
@@ -142,6 +151,8 @@ if ! command -v uvicorn >/dev/null 2>&1; then
     exit 1
 fi
 
+# uvicorn's --loop/--http default to "auto", which selects uvloop and
+# httptools (both in the API requirements) and falls back to asyncio/h11.
 UVICORN_CMD=(
     uvicorn
     main:app
@@ -164,6 +175,8 @@ if [ "$DEV_MODE" = "dev" ]; then
     if [ -d "rotation" ]; then
         UVICORN_CMD+=(--reload-dir rotation)
     fi
+else
+    UVICORN_CMD+=(--no-access-log)
 fi
 
 # Start uvicorn and capture output